@@ -1,8 +1,17 @@
+import hashlib
+import io
+import json
 import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List
+
 import pandas as pd
 import streamlit as st
 
+from incident_io import read_csv
+from llm_cache import cache_from_env
 from rca_scoring import OllamaClient, evaluate_incident, critic_review, improve_rca
+from telemetry import hooks_from_env
 
 st.set_page_config(page_title="RCA Quality Analyst", layout="wide")
 st.title("RCA Quality Analyst (lokal, CSV → Score/Feedback/Improve)")
@@ -10,8 +19,19 @@ st.title("RCA Quality Analyst (lokal, CSV → Score/Feedback/Improve)")
 with st.sidebar:
     st.header("LLM (Ollama)")
     model = st.text_input("Model", value=os.getenv("OLLAMA_MODEL", "llama3.1:8b"))
-    host = st.text_input("Host", value=os.getenv("OLLAMA_HOST", "http://localhost:11434"))
+    host = st.text_input(
+        "Host",
+        value=os.getenv("OLLAMA_HOST", "http://localhost:11434"),
+        help="Mehrere Ollama-Server kommagetrennt angeben",
+    )
     st.caption("Tipp: `ollama pull llama3.1:8b`")
+    use_cache = st.checkbox("Antwort-Cache nutzen", value=True, help="Gleiche Anfragen ohne erneute Inferenz beantworten")
+    use_chat = st.checkbox(
+        "Chat-Endpoint",
+        value=os.getenv("OLLAMA_CHAT", "0") == "1",
+        help="Anweisungen als System-Message über /api/chat (Prompt-Prefix wird wiederverwendet)",
+    )
+    use_stream = st.checkbox("Streaming", value=True, help="Teilergebnisse live anzeigen, Generierung endet mit dem JSON")
     st.divider()
     st.header("CSV Mapping")
     st.caption("Ordne deine Jira-Export-Spalten zu.")
@@ -21,11 +41,25 @@ if not uploaded:
     st.info("CSV hochladen → Spalten mappen → Incident wählen → bewerten.")
     st.stop()
 
-# robust read
-try:
-    df = pd.read_csv(uploaded).fillna("")
-except UnicodeDecodeError:
-    df = pd.read_csv(uploaded, encoding="latin-1").fillna("")
+
+@st.cache_resource(max_entries=3, show_spinner="CSV wird gelesen...")
+def load_upload(upload_hash: str, _data: bytes) -> pd.DataFrame:
+    # Keyed by content hash only. cache_resource hands back the same frame on every
+    # rerun instead of unpickling a copy (the app never mutates it).
+    return read_csv(io.BytesIO(_data))
+
+
+@st.cache_resource(max_entries=12)
+def id_lookup(upload_hash: str, id_col: str, _df: pd.DataFrame) -> Dict[str, object]:
+    """Incident id list for the picker plus id -> row position (first occurrence wins)."""
+    ids = _df[id_col].astype(str)
+    first = ids[~ids.duplicated()]
+    return {"ids": ids.tolist(), "positions": dict(zip(first.tolist(), first.index.tolist()))}
+
+
+data = uploaded.getvalue()
+upload_hash = hashlib.sha256(data).hexdigest()
+df = load_upload(upload_hash, data)
 
 st.success(f"CSV geladen: {df.shape[0]} Zeilen, {df.shape[1]} Spalten")
 
@@ -48,15 +82,16 @@ with left:
     st.subheader("Incidents (Preview)")
     st.dataframe(df[[incident_id_col, summary_col]].head(200), use_container_width=True)
 
-    incident_ids = df[incident_id_col].astype(str).tolist()
+    lookup = id_lookup(upload_hash, incident_id_col, df)
+    incident_ids: List[str] = lookup["ids"]
     chosen = st.selectbox("Wähle Incident", options=incident_ids)
 
-row_df = df[df[incident_id_col].astype(str) == str(chosen)]
-if row_df.empty:
+pos = lookup["positions"].get(str(chosen))
+if pos is None:
     st.error("Incident nicht gefunden (Mapping prüfen).")
     st.stop()
 
-row = row_df.iloc[0]
+row = df.iloc[pos]
 row_obj = {
     "incident_id": str(row[incident_id_col]),
     "summary": str(row[summary_col]),
@@ -82,36 +117,48 @@ with right:
 st.divider()
 st.subheader("Analyse")
 
-client = OllamaClient(model=model, host=host)
 
-for k in ["evaluation", "critic", "improved"]:
-    if k not in st.session_state:
-        st.session_state[k] = None
+@st.cache_resource
+def get_llm_cache():
+    return cache_from_env()
+
+
+@st.cache_resource
+def get_client(model: str, host: str, use_cache: bool, use_stream: bool, use_chat: bool) -> OllamaClient:
+    # survives reruns, so the HTTP connection pool is reused between clicks
+    return OllamaClient(
+        model=model,
+        host=host,
+        cache=get_llm_cache() if use_cache else None,
+        keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+        stream=use_stream,
+        use_chat=use_chat,
+        metrics=hooks_from_env(),
+    )
+
+
+client = get_client(model, host, use_cache, use_stream, use_chat)
+
+# Results per incident content + model: switching back to an incident shows its
+# earlier results, and an edited row (new upload) or another model starts fresh.
+result_key = hashlib.sha256(json.dumps([model, row_obj], sort_keys=True).encode("utf-8")).hexdigest()
+store = st.session_state.setdefault("results", {})
+results = store.setdefault(result_key, {"evaluation": None, "critic": None, "improved": None})
 
-colA, colB, colC = st.columns([1, 1, 1])
+colA, colB, colC, colD = st.columns([1, 1, 1, 1])
 do_eval = colA.button("1) Bewerten")
 do_critic = colB.button("2) Critic Review")
 do_improve = colC.button("3) Verbesserte Version")
+do_all = colD.button("Alles ausführen", type="primary")
 
-if do_eval:
-    with st.spinner("Bewertung läuft..."):
-        st.session_state["evaluation"] = evaluate_incident(client, row_obj)
-        st.session_state["critic"] = None
-        st.session_state["improved"] = None
+# Streaming mode: completed top-level fields (e.g. scores) show up while the model is still writing
+live = st.empty()
 
-if do_critic:
-    if not st.session_state["evaluation"]:
-        st.warning("Bitte erst bewerten (Schritt 1).")
-    else:
-        with st.spinner("Critic Review läuft..."):
-            st.session_state["critic"] = critic_review(client, row_obj, st.session_state["evaluation"])
+# One slot per result panel, so a panel can be (re)drawn as soon as its data arrives
+slots = {"evaluation": st.empty(), "critic": st.empty(), "improved": st.empty()}
 
-if do_improve:
-    with st.spinner("Verbesserung läuft..."):
-        st.session_state["improved"] = improve_rca(client, row_obj)
 
-eval_json = st.session_state["evaluation"]
-if eval_json:
+def render_evaluation(eval_json: Dict) -> None:
     s = eval_json.get("scores", {})
     total = eval_json.get("total", None)
 
@@ -134,8 +181,8 @@ if eval_json:
     with st.expander("Raw JSON: Evaluation"):
         st.json(eval_json)
 
-critic_json = st.session_state["critic"]
-if critic_json:
+
+def render_critic(critic_json: Dict) -> None:
     st.divider()
     st.subheader("Critic Review")
     st.write("**Confidence:**", critic_json.get("confidence", "—"))
@@ -146,8 +193,8 @@ if critic_json:
     with st.expander("Raw JSON: Critic"):
         st.json(critic_json)
 
-improved_json = st.session_state["improved"]
-if improved_json:
+
+def render_improved(improved_json: Dict) -> None:
     st.divider()
     st.subheader("Verbesserte Version (ohne Fakten zu erfinden)")
     st.write("**Improved Root Cause**")
@@ -160,3 +207,65 @@ if improved_json:
     st.write(improved_json.get("notes", []))
     with st.expander("Raw JSON: Improved"):
         st.json(improved_json)
+
+
+RENDERERS = {"evaluation": render_evaluation, "critic": render_critic, "improved": render_improved}
+
+
+def render(kind: str) -> None:
+    if results[kind]:
+        with slots[kind].container():
+            RENDERERS[kind](results[kind])
+    else:
+        slots[kind].empty()
+
+
+def run_all() -> None:
+    """
+    Evaluation and improvement are independent and run concurrently; the critic
+    starts as soon as the evaluation lands. Each panel renders when its result arrives.
+    Time to a full analysis is ~max(eval + critic, improve) instead of the sum.
+    """
+    results["critic"] = None
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        pending = {
+            pool.submit(evaluate_incident, client, row_obj): "evaluation",
+            pool.submit(improve_rca, client, row_obj): "improved",
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                kind = pending.pop(fut)
+                results[kind] = fut.result()
+                render(kind)
+                if kind == "evaluation":
+                    pending[pool.submit(critic_review, client, row_obj, results["evaluation"])] = "critic"
+
+
+if do_all:
+    with st.spinner("Analyse läuft (Bewertung + Verbesserung parallel, danach Critic)..."):
+        run_all()
+
+if do_eval:
+    with st.spinner("Bewertung läuft..."):
+        results["evaluation"] = evaluate_incident(client, row_obj, on_partial=live.json)
+        results["critic"] = None
+        results["improved"] = None
+
+if do_critic:
+    if not results["evaluation"]:
+        st.warning("Bitte erst bewerten (Schritt 1).")
+    else:
+        with st.spinner("Critic Review läuft..."):
+            results["critic"] = critic_review(
+                client, row_obj, results["evaluation"], on_partial=live.json
+            )
+
+if do_improve:
+    with st.spinner("Verbesserung läuft..."):
+        results["improved"] = improve_rca(client, row_obj, on_partial=live.json)
+
+live.empty()
+
+for kind in slots:
+    render(kind)
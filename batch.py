@@ -1,13 +1,33 @@
 import argparse
+import hashlib
+import json
 import os
 import sys
+import threading
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Sequence
 
 import pandas as pd
 
-from rca_scoring import OllamaClient, evaluate_incident
+from dedup import NearDuplicateIndex, with_clusters
+from heuristics import with_heuristics
+from incident_io import DEFAULT_CHUNKSIZE, ensure_cols, iter_csv_chunks, read_csv, read_header, records
+from llm_cache import ResponseCache, DEFAULT_CACHE_PATH
+from prompts import PROMPT_VERSION
+from telemetry import JsonlSink, MetricsCollector
+from rca_scoring import BUDGET_VERSION, OllamaClient, critic_review, evaluate_incident, evaluate_incidents_packed, improve_rca
+
+STAGES = ["eval", "critic", "improve"]
+
+# Extra results.csv columns per optional stage; a stage error lands in the first one
+STAGE_COLUMNS = {
+    "critic": ["critic_confidence", "critic_top_risks", "critic_missing_evidence"],
+    "improve": ["improved_root_cause", "improved_resolution", "improved_preventive_action"],
+}
 
 
 def parse_args() -> argparse.Namespace:
@@ -15,7 +35,28 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--csv", required=True, help="Path to input CSV (Jira export or sample)")
     p.add_argument("--outdir", default="out", help="Output directory (default: out)")
     p.add_argument("--model", default=os.getenv("OLLAMA_MODEL", "llama3.1:8b"), help="Ollama model")
-    p.add_argument("--host", default=os.getenv("OLLAMA_HOST", "http://localhost:11434"), help="Ollama host")
+    p.add_argument(
+        "--host",
+        default=os.getenv("OLLAMA_HOST", "http://localhost:11434"),
+        help="Ollama host; comma-separated for several servers (requests go to the least loaded one)",
+    )
+    p.add_argument(
+        "--keep-alive",
+        default=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+        help="How long Ollama keeps the model loaded between requests (default: 30m)",
+    )
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream responses and stop generation as soon as the JSON object is complete",
+    )
+    p.add_argument(
+        "--chat",
+        action="store_true",
+        default=os.getenv("OLLAMA_CHAT", "0") == "1",
+        help="Use /api/chat with the static instructions as system message (prefix-cache friendly)",
+    )
+    p.add_argument("--retries", type=int, default=3, help="Retries on connection errors / 5xx (default: 3)")
 
     # Column mapping (defaults match our sample)
     p.add_argument("--col-id", default="issue_key")
@@ -26,17 +67,96 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--col-preventive", default="preventive_action")
 
     p.add_argument("--limit", type=int, default=0, help="Limit rows for quick runs (0 = all)")
+    p.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows read from the CSV per chunk")
+    p.add_argument(
+        "--engine",
+        choices=["c", "pyarrow"],
+        default="c",
+        help="CSV parser (pyarrow is faster on multi-GB exports, needs `pip install pyarrow`)",
+    )
     p.add_argument("--fail-fast", action="store_true", help="Stop on first error")
+    p.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Parallel LLM requests (OLLAMA_NUM_PARALLEL of the server, summed over all --host servers; default: 1)",
+    )
+    p.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Let each host's in-flight limit follow observed latency and errors (up to --concurrency)",
+    )
+    p.add_argument(
+        "--pack",
+        type=int,
+        default=1,
+        help="Score K incidents per eval request under one shared rubric (default: 1 = off)",
+    )
+    p.add_argument(
+        "--dedup",
+        type=float,
+        default=0.0,
+        metavar="SIMILARITY",
+        help="Score near-duplicate RCAs once: incidents whose root cause / resolution / preventive action "
+        "text is at least this similar (0..1, e.g. 0.9) share one result (default: 0 = off)",
+    )
+    p.add_argument(
+        "--triage",
+        action="store_true",
+        help="Pre-score with text heuristics; clear-cut incidents are settled without a model call",
+    )
+    p.add_argument(
+        "--triage-low",
+        type=int,
+        default=30,
+        help="Heuristic total at or below which an incident is settled as poor (default: 30)",
+    )
+    p.add_argument(
+        "--triage-high",
+        type=int,
+        default=101,
+        help="Heuristic total at or above which an incident is settled as good (default: 101 = never)",
+    )
+    p.add_argument(
+        "--triage-audit",
+        type=float,
+        default=0.05,
+        help="Share of clear-cut incidents still sent to the model to measure agreement (default: 0.05)",
+    )
+    p.add_argument(
+        "--stages",
+        default="eval",
+        help="Comma-separated pipeline stages: eval[,critic][,improve] (default: eval)",
+    )
+    p.add_argument("--critic-concurrency", type=int, default=0, help="Parallel critic requests (default: --concurrency)")
+    p.add_argument(
+        "--improve-concurrency", type=int, default=0, help="Parallel improve requests (default: --concurrency)"
+    )
+    p.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue a previous run in --outdir: skip incidents already scored in results.jsonl",
+    )
+    p.add_argument(
+        "--previous",
+        default="",
+        help="Previous results.csv / results.jsonl / output dir: reuse scores of incidents "
+        "unchanged since then (same mapped fields, model and prompts)",
+    )
+    p.add_argument(
+        "--prometheus",
+        default="",
+        help="Also write LLM call metrics in Prometheus text format to this path",
+    )
+    p.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="LLM response cache (SQLite)")
+    p.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
     return p.parse_args()
 
 
-def ensure_cols(df: pd.DataFrame, cols: List[str]) -> None:
-    missing = [c for c in cols if c not in df.columns]
-    if missing:
-        raise ValueError(f"Missing required columns in CSV: {missing}\nAvailable: {list(df.columns)}")
+INCIDENT_FIELDS = ["incident_id", "summary", "description", "root_cause", "resolution", "preventive_action"]
 
 
-def row_to_obj(row: pd.Series, colmap: Dict[str, str]) -> Dict[str, Any]:
+def row_to_obj(row: Dict[str, Any], colmap: Dict[str, str]) -> Dict[str, Any]:
     return {
         "incident_id": str(row[colmap["id"]]),
         "summary": str(row[colmap["summary"]]),
@@ -47,6 +167,491 @@ def row_to_obj(row: pd.Series, colmap: Dict[str, str]) -> Dict[str, Any]:
     }
 
 
+def incident_fingerprint(incident: Dict[str, Any], model: str) -> str:
+    """Hash of the mapped fields plus model, prompt and input budget version; equal means the score can be reused."""
+    parts = [model, PROMPT_VERSION, BUDGET_VERSION] + [incident[k] for k in INCIDENT_FIELDS]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+def row_tags(incident: Dict[str, Any]) -> Dict[str, Any]:
+    tags = {"fingerprint": incident.get("fingerprint", "")}
+    if "cluster_id" in incident:
+        tags["cluster_id"] = incident["cluster_id"]
+    if "triage" in incident:
+        tags["triage"] = incident["triage"]
+        tags["triage_rule"] = incident["triage_rule"]
+        tags["heuristic_total"] = incident["heuristic"]["total"]
+    return tags
+
+
+def result_row(incident: Dict[str, Any], evaluation: Dict[str, Any]) -> Dict[str, Any]:
+    scores = evaluation.get("scores", {}) or {}
+    tokens = evaluation.get("_input_tokens")
+    row = {
+        "incident_id": incident["incident_id"],
+        "summary": incident["summary"],
+        "total": evaluation.get("total"),
+        "clarity": scores.get("clarity"),
+        "depth": scores.get("depth"),
+        "evidence": scores.get("evidence"),
+        "corrective": scores.get("corrective"),
+        "preventive": scores.get("preventive"),
+        "executive_summary": evaluation.get("executive_summary", ""),
+        **row_tags(incident),
+    }
+    if tokens:
+        # estimated tokens of the incident fields before / after budget trimming
+        row["input_tokens"] = tokens["original"]
+        row["input_tokens_sent"] = tokens["sent"]
+    return row
+
+
+def error_row(incident: Dict[str, Any], e: Exception) -> Dict[str, Any]:
+    return {
+        "incident_id": incident["incident_id"],
+        "summary": incident["summary"],
+        "total": None,
+        "clarity": None,
+        "depth": None,
+        "evidence": None,
+        "corrective": None,
+        "preventive": None,
+        "executive_summary": f"ERROR: {e}",
+        **row_tags(incident),
+    }
+
+
+def critic_columns(critic: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "critic_confidence": critic.get("confidence", ""),
+        "critic_top_risks": " | ".join(critic.get("top_risks", [])),
+        "critic_missing_evidence": " | ".join(critic.get("missing_evidence_requests", [])),
+    }
+
+
+def improve_columns(improved: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "improved_root_cause": improved.get("improved_root_cause", ""),
+        "improved_resolution": improved.get("improved_resolution", ""),
+        "improved_preventive_action": improved.get("improved_preventive_action", ""),
+    }
+
+
+def score_one(
+    client: OllamaClient,
+    incident: Dict[str, Any],
+    fail_fast: bool,
+    stages: Sequence[str] = ("eval",),
+    slots: Optional[Dict[str, threading.Semaphore]] = None,
+    evaluation: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Runs the requested stages for one incident. Each stage call holds that stage's
+    slot, so per-stage concurrency is bounded while incident i can be in critic
+    and incident i+1 in eval at the same time. A precomputed evaluation (from a
+    packed request) skips the eval call.
+    """
+
+    def slot(stage: str):
+        return slots[stage] if slots else nullcontext()
+
+    try:
+        if evaluation is None:
+            with slot("eval"):
+                evaluation = evaluate_incident(client, incident)
+    except Exception as e:
+        print(f"[ERR] {incident['incident_id']}: {e}", file=sys.stderr)
+        if fail_fast:
+            raise
+        return error_row(incident, e)
+    print(f"[OK] {incident['incident_id']} -> {evaluation.get('total')}")
+    row = result_row(incident, evaluation)
+
+    stage_calls = {
+        "critic": lambda: critic_columns(critic_review(client, incident, evaluation)),
+        "improve": lambda: improve_columns(improve_rca(client, incident)),
+    }
+    for stage, call in stage_calls.items():
+        if stage not in stages:
+            continue
+        try:
+            with slot(stage):
+                row.update(call())
+        except Exception as e:
+            print(f"[ERR] {incident['incident_id']} ({stage}): {e}", file=sys.stderr)
+            if fail_fast:
+                raise
+            row[STAGE_COLUMNS[stage][0]] = f"ERROR: {e}"
+    return row
+
+
+PACK_STATS = {"packs": 0, "packed": 0, "fallback": 0}
+DELTA_STATS = {"reused": 0}
+DEDUP_STATS = {"propagated": 0}
+TRIAGE_STATS = {"settled": 0, "audit": 0, "llm": 0}
+_pack_lock = threading.Lock()
+
+
+def score_group(
+    client: OllamaClient,
+    group: List[Dict[str, Any]],
+    fail_fast: bool,
+    stages: Sequence[str] = ("eval",),
+    slots: Optional[Dict[str, threading.Semaphore]] = None,
+) -> List[Dict[str, Any]]:
+    """Evaluates a group in one packed request; incidents missing from the answer fall back to single calls."""
+    try:
+        with slots["eval"] if slots else nullcontext():
+            evaluations, sent = evaluate_incidents_packed(client, group)
+    except Exception as e:
+        print(f"[WARN] packed request failed, falling back to single calls: {e}", file=sys.stderr)
+        evaluations, sent = {}, len(group)
+    with _pack_lock:
+        # groups with too few incidents within the context budget make no packed request
+        if sent:
+            PACK_STATS["packs"] += 1
+            PACK_STATS["packed"] += sent
+        PACK_STATS["fallback"] += sum(1 for inc in group if inc["incident_id"] not in evaluations)
+    return [
+        score_one(client, inc, fail_fast, stages, slots, evaluation=evaluations.get(inc["incident_id"]))
+        for inc in group
+    ]
+
+
+def triage_rule(low: int, high: int) -> str:
+    """Thresholds a settled row was decided with; such rows are only reused under the same ones."""
+    return f"<={low},>={high}"
+
+
+def triage(incidents: Iterable[Dict[str, Any]], low: int, high: int, audit: float) -> Iterator[Dict[str, Any]]:
+    """
+    Labels incidents by their heuristic total (see heuristics.with_heuristics):
+    "settled" (<= low or >= high, no model call), "audit" (every 1/audit-th
+    clear-cut one, still scored by the model for the agreement report) or "llm".
+    TRIAGE_STATS is counted in _plan, for incidents that are not reused or copied.
+    """
+    every = round(1 / audit) if audit > 0 else 0
+    rule = triage_rule(low, high)
+    clear_cut = 0
+    for inc in with_heuristics(incidents):
+        total = inc["heuristic"]["total"]
+        label = "llm"
+        if total <= low or total >= high:
+            clear_cut += 1
+            label = "audit" if every and clear_cut % every == 0 else "settled"
+        yield {**inc, "triage": label, "triage_rule": rule}
+
+
+def _plan(
+    incidents: Iterable[Dict[str, Any]], pack: int, previous: Optional[Dict[str, Dict[str, Any]]]
+) -> Iterator[Any]:
+    """
+    Yields, in input order, ("row", result) for incidents whose previous result
+    is reused or that triage settled, ("copy", incident) for near-duplicates that take their cluster
+    representative's result, and ("run", incident) for the rest.
+    With packing the rest yield ("join", incident) instead, and ("send", group) once
+    `pack` of them are collected (or the input ends); rows in between stay in
+    their input position behind the open group (see score_incidents).
+    """
+    group: List[Dict[str, Any]] = []
+    for inc in incidents:
+        prev = previous.get(inc.get("fingerprint", "")) if previous else None
+        rep = inc.get("cluster_id", inc["incident_id"])
+        settled = inc.get("triage") == "settled"
+        if prev is not None:
+            DELTA_STATS["reused"] += 1
+            yield "row", {**prev, "cluster_id": rep} if "cluster_id" in inc else prev
+        elif rep != inc["incident_id"]:
+            DEDUP_STATS["propagated"] += 1
+            yield "copy", inc
+        elif settled:
+            TRIAGE_STATS["settled"] += 1
+            yield "row", result_row(inc, inc["heuristic"])
+        else:
+            if "triage" in inc:
+                TRIAGE_STATS[inc["triage"]] += 1
+            if pack <= 1:
+                yield "run", inc
+            else:
+                group.append(inc)
+                yield "join", inc
+                if len(group) >= pack:
+                    yield "send", group
+                    group = []
+    if group:
+        yield "send", group
+
+
+def cluster_member_row(rep_row: Dict[str, Any], incident: Dict[str, Any]) -> Dict[str, Any]:
+    """The representative's result under a near-duplicate incident's own ID, fingerprint and triage tags."""
+    scores = {k: v for k, v in rep_row.items() if k not in ("triage", "triage_rule", "heuristic_total")}
+    return {**scores, "incident_id": incident["incident_id"], "summary": incident["summary"], **row_tags(incident)}
+
+
+def score_incidents(
+    client: OllamaClient,
+    incidents: Iterable[Dict[str, Any]],
+    concurrency: int = 1,
+    fail_fast: bool = False,
+    stages: Sequence[str] = ("eval",),
+    stage_concurrency: Optional[Dict[str, int]] = None,
+    pack: int = 1,
+    previous: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Scores incidents and yields result rows in input order.
+    With concurrency > 1 at most `concurrency` requests are in flight; with
+    fail_fast the first error cancels everything not yet started and is re-raised.
+    With more than one stage, stage_concurrency caps each stage separately and
+    incidents flow through the stages as a pipeline.
+    With pack > 1, `pack` incidents share one eval request (see score_group).
+    `previous` maps incident fingerprints to earlier result rows that are yielded
+    as they are instead of being scored again. Incidents carrying a cluster_id
+    other than their own ID (see dedup.with_clusters) get that representative's result.
+    """
+    slots = None
+    if len(stages) > 1:
+        limits = {st: max((stage_concurrency or {}).get(st) or concurrency, 1) for st in stages}
+        slots = {st: threading.Semaphore(n) for st, n in limits.items()}
+        # enough workers to keep every stage busy at its limit
+        concurrency = sum(limits.values())
+
+    if pack > 1:
+        work = score_group
+    else:
+
+        def work(*a: Any) -> List[Dict[str, Any]]:
+            return [score_one(*a)]
+
+    # cluster representative ID -> its result row once done, or its future while it is still being scored
+    rep_rows: Dict[str, Dict[str, Any]] = {}
+    rep_futures: Dict[str, Future] = {}
+    rep_lock = threading.Lock()
+
+    def done(rows: List[Dict[str, Any]]) -> Future:
+        f: Future = Future()
+        f.set_result(rows)
+        return f
+
+    def remember(f: Future, item: Dict[str, Any]) -> None:
+        if item.get("cluster_id") != item["incident_id"]:
+            return
+        rep = item["incident_id"]
+        with rep_lock:
+            rep_futures[rep] = f
+
+        def keep_row(d: Future) -> None:
+            # a failed future stays, so its copies get the same error
+            if d.cancelled() or d.exception() is not None:
+                return
+            with rep_lock:
+                rep_rows[rep] = d.result()[0]
+                if rep_futures.get(rep) is d:
+                    del rep_futures[rep]
+
+        f.add_done_callback(keep_row)
+
+    def forward(src: Future, dst: Future, pick: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]) -> None:
+        """Completes dst with pick(rows of src), or src's error."""
+
+        def copy(s: Future) -> None:
+            try:
+                try:
+                    rows = pick(s.result())
+                except BaseException as e:
+                    dst.set_exception(e)
+                else:
+                    dst.set_result(rows)
+            except InvalidStateError:
+                # dst was cancelled
+                pass
+
+        src.add_done_callback(copy)
+        dst.add_done_callback(lambda d: d.cancelled() and src.cancel())
+
+    def copy_of(incident: Dict[str, Any]) -> Future:
+        rep = incident["cluster_id"]
+        with rep_lock:
+            rep_row = rep_rows.get(rep)
+            src = rep_futures.get(rep)
+        if rep_row is not None:
+            return done([cluster_member_row(rep_row, incident)])
+        f: Future = Future()
+        forward(src, f, lambda rows: [cluster_member_row(rows[0], incident)])
+        return f
+
+    # (future, counted in running?) in input order; reused and copied rows need no worker
+    pending: deque = deque()
+    running = 0
+    # one future per member of the pack group being filled; rows after a member
+    # queue behind it, so the group is sent full and rows still come out in input order
+    group: List[Future] = []
+    with ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else nullcontext() as pool:
+
+        def submit(unit: Any) -> Future:
+            if pool is None:
+                return done(work(client, unit, fail_fast, stages, slots))
+            return pool.submit(work, client, unit, fail_fast, stages, slots)
+
+        try:
+            for kind, unit in _plan(incidents, pack, previous):
+                if kind == "send":
+                    sent = submit(unit)
+                    for j, member in enumerate(group):
+                        forward(sent, member, lambda rows, j=j: rows[j : j + 1])
+                    group = []
+                    running += 1
+                else:
+                    if kind == "row":
+                        f = done([unit])
+                        remember(f, unit)
+                    elif kind == "copy":
+                        f = copy_of(unit)
+                    elif kind == "join":
+                        f = Future()
+                        group.append(f)
+                        remember(f, unit)
+                    else:
+                        f = submit(unit)
+                        remember(f, unit)
+                        running += 1
+                    # a group counts once, on its first member
+                    pending.append((f, kind == "run" or (kind == "join" and len(group) == 1)))
+                # keep a small window so workers never idle while the head finishes;
+                # members of the open group are not sent yet, so they are never waited for
+                while pending and pending[0][0] not in group and (pending[0][0].done() or running >= concurrency * 2):
+                    f, submitted = pending.popleft()
+                    running -= submitted
+                    yield from f.result()
+            while pending:
+                yield from pending.popleft()[0].result()
+        finally:
+            for f, _ in pending:
+                f.cancel()
+
+
+RESULT_COLUMNS = [
+    "incident_id",
+    "summary",
+    "total",
+    "clarity",
+    "depth",
+    "evidence",
+    "corrective",
+    "preventive",
+    "executive_summary",
+    "fingerprint",
+]
+# Extra numeric columns some runs add (triage, input budget)
+NUMERIC_EXTRAS = ["heuristic_total", "input_tokens", "input_tokens_sent"]
+
+
+def read_checkpoint(path: Path) -> List[Dict[str, Any]]:
+    """Reads results.jsonl; a torn last line from an interrupted run is ignored."""
+    if not path.exists():
+        return []
+    rows: List[Dict[str, Any]] = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return rows
+
+
+def is_complete(row: Dict[str, Any], stages: Sequence[str], rule: Optional[str] = None) -> bool:
+    """
+    True if a checkpoint row has a score and a non-error result for every requested stage.
+    Rows settled by the heuristic pre-scorer count only for a run triaging with the same rule.
+    """
+    if row.get("total") is None:
+        return False
+    if row.get("triage") == "settled":
+        # no model stages by design
+        return rule is not None and row.get("triage_rule") == rule
+    for stage in stages:
+        if stage in STAGE_COLUMNS:
+            value = row.get(STAGE_COLUMNS[stage][0])
+            if value is None or str(value).startswith("ERROR:"):
+                return False
+    return True
+
+
+def log_limit_change(host: str, old: int, new: int, reason: str) -> None:
+    print(f"[LIMIT] {host}: {old} -> {new} ({reason})", file=sys.stderr)
+
+
+def load_previous(path: Path, stages: Sequence[str], rule: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Complete result rows of an earlier run (results.jsonl, results.csv or the
+    output directory holding them), keyed by incident fingerprint.
+    `rule` is the current run's triage rule (see is_complete).
+    """
+    if path.is_dir():
+        path = path / "results.jsonl" if (path / "results.jsonl").exists() else path / "results.csv"
+    if path.suffix == ".jsonl":
+        rows = read_checkpoint(path)
+    else:
+        rows = read_csv(path).to_dict("records")
+        for row in rows:
+            # CSV cells are text; empty means "no score"
+            for col in RESULT_COLUMNS[2:8] + [c for c in NUMERIC_EXTRAS if c in row]:
+                row[col] = int(float(row[col])) if row.get(col) not in (None, "") else None
+    previous = {}
+    for row in rows:
+        fp = row.get("fingerprint")
+        if fp and is_complete(row, stages, rule):
+            previous[fp] = row
+    return previous
+
+
+def checkpoint_df(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Latest result per incident (a resumed run re-scores earlier ERROR rows)."""
+    optional = ["cluster_id", "triage", "triage_rule"] + NUMERIC_EXTRAS + [c for cols in STAGE_COLUMNS.values() for c in cols]
+    extra = [c for c in optional if any(c in r for r in rows)]
+    df = pd.DataFrame(rows, columns=RESULT_COLUMNS + extra)
+    df = df.drop_duplicates(subset="incident_id", keep="last")
+    df["total"] = pd.to_numeric(df["total"])
+    for col in NUMERIC_EXTRAS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df.reset_index(drop=True)
+
+
+def triage_report(res_df: pd.DataFrame, low: int, high: int) -> str:
+    lines = [
+        "## Heuristic Triage",
+        f"- Settled without a model call: {TRIAGE_STATS['settled']} (total <= {low} or >= {high})",
+        f"- Sent to the model: {TRIAGE_STATS['llm']} borderline + {TRIAGE_STATS['audit']} clear-cut audit sample",
+    ]
+    if "heuristic_total" in res_df.columns:
+        scored = res_df[res_df["triage"].isin(["llm", "audit"]) & res_df["total"].notna()]
+        if "cluster_id" in scored.columns:
+            # near-duplicates carry their representative's score, not one of their own
+            own = scored["cluster_id"].isna() | (scored["cluster_id"].astype(str) == scored["incident_id"].astype(str))
+            scored = scored[own]
+        h = pd.to_numeric(scored["heuristic_total"])
+        if len(scored) >= 2:
+            lines.append(
+                f"- Agreement on {len(scored)} model-scored incidents: "
+                f"MAE {(scored['total'] - h).abs().mean():.1f} points, Pearson r {scored['total'].corr(h):.2f}"
+            )
+        audit = scored[scored["triage"] == "audit"]
+        if len(audit):
+            ha = pd.to_numeric(audit["heuristic_total"])
+            # same verdict: the model also puts the incident on the heuristic's side of 50
+            same = ((ha <= low) & (audit["total"] < 50)) | ((ha >= high) & (audit["total"] >= 50))
+            lines.append(
+                f"- Audit sample ({len(audit)}): model agrees with the settled verdict in {same.mean():.0%}, "
+                f"MAE {(audit['total'] - ha).abs().mean():.1f} points"
+            )
+    return "\n".join(lines) + "\n\n"
+
+
 def main() -> int:
     args = parse_args()
 
@@ -58,15 +663,6 @@ def main() -> int:
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    # Read CSV robustly
-    try:
-        df = pd.read_csv(in_path).fillna("")
-    except UnicodeDecodeError:
-        df = pd.read_csv(in_path, encoding="latin-1").fillna("")
-
-    if args.limit and args.limit > 0:
-        df = df.head(args.limit)
-
     colmap = {
         "id": args.col_id,
         "summary": args.col_summary,
@@ -76,52 +672,104 @@ def main() -> int:
         "preventive": args.col_preventive,
     }
 
-    ensure_cols(df, list(colmap.values()))
+    ensure_cols(read_header(in_path), list(colmap.values()))
 
-    client = OllamaClient(model=args.model, host=args.host)
+    stages = [st.strip() for st in args.stages.split(",") if st.strip()]
+    unknown = [st for st in stages if st not in STAGES]
+    if unknown or "eval" not in stages:
+        print(f"ERROR: --stages must include eval and only use {STAGES}, got {args.stages!r}", file=sys.stderr)
+        return 2
+    stage_concurrency = {
+        "eval": args.concurrency,
+        "critic": args.critic_concurrency or args.concurrency,
+        "improve": args.improve_concurrency or args.concurrency,
+    }
 
-    results: List[Dict[str, Any]] = []
-    started = datetime.utcnow().isoformat() + "Z"
+    cache = None if args.no_cache else ResponseCache(args.cache_path)
+    # per-call LLM telemetry: raw records to llm_calls.jsonl, aggregates for the report
+    calls_jsonl = outdir / "llm_calls.jsonl"
+    if not args.resume and calls_jsonl.exists():
+        calls_jsonl.unlink()
+    collector = MetricsCollector()
+    call_sink = JsonlSink(str(calls_jsonl))
+    client = OllamaClient(
+        model=args.model,
+        host=args.host,
+        cache=cache,
+        keep_alive=args.keep_alive,
+        max_retries=args.retries,
+        stream=args.stream,
+        use_chat=args.chat,
+        metrics=[collector, call_sink],
+        pool_size=max(sum(stage_concurrency[st] for st in stages), 1),
+        adaptive_concurrency=max(sum(stage_concurrency[st] for st in stages), 1) if args.adaptive else 0,
+        on_limit_change=log_limit_change,
+    )
 
-    for idx, r in df.iterrows():
-        incident = row_to_obj(r, colmap)
+    started = datetime.utcnow().isoformat() + "Z"
 
+    # Every result is appended to the checkpoint as soon as it is available;
+    # results.csv and report.md are derived from it at the end.
+    checkpoint = outdir / "results.jsonl"
+    rule = triage_rule(args.triage_low, args.triage_high) if args.triage else None
+    previous: Dict[str, Dict[str, Any]] = {}
+    if args.previous:
+        prev_path = Path(args.previous)
+        if not prev_path.exists():
+            print(f"ERROR: previous results not found: {prev_path}", file=sys.stderr)
+            return 2
+        # read before the checkpoint below is reset, it may be the same file
+        previous = load_previous(prev_path, stages, rule)
+        print(f"Delta mode: {len(previous)} reusable results in {prev_path}")
+        if not previous:
+            print("[WARN] no reusable rows (no fingerprint column or different stages); scoring everything", file=sys.stderr)
+    done = set()
+    if args.resume:
+        done = {str(r["incident_id"]) for r in read_checkpoint(checkpoint) if is_complete(r, stages, rule)}
+        print(f"Resuming: {len(done)} incidents already scored in {checkpoint}")
+    elif checkpoint.exists():
+        checkpoint.unlink()
+
+    # Stream the export chunk by chunk, loading only the mapped columns
+    chunks = iter_csv_chunks(
+        in_path, list(colmap.values()), chunksize=args.chunksize, limit=args.limit, engine=args.engine
+    )
+    incidents = (
+        {**inc, "fingerprint": incident_fingerprint(inc, args.model)}
+        for inc in (row_to_obj(r, colmap) for r in records(chunks))
+        if inc["incident_id"] not in done
+    )
+    dedup_index = None
+    if args.dedup > 0:
+        dedup_index = NearDuplicateIndex(args.dedup)
+        incidents = with_clusters(incidents, dedup_index)
+    if args.triage:
+        incidents = triage(incidents, args.triage_low, args.triage_high, args.triage_audit)
+    interrupted = False
+    with checkpoint.open("a", encoding="utf-8") as ckpt:
         try:
-            evaluation = evaluate_incident(client, incident)
-            scores = evaluation.get("scores", {}) or {}
-            results.append(
-                {
-                    "incident_id": incident["incident_id"],
-                    "summary": incident["summary"],
-                    "total": evaluation.get("total"),
-                    "clarity": scores.get("clarity"),
-                    "depth": scores.get("depth"),
-                    "evidence": scores.get("evidence"),
-                    "corrective": scores.get("corrective"),
-                    "preventive": scores.get("preventive"),
-                    "executive_summary": evaluation.get("executive_summary", ""),
-                }
-            )
-            print(f"[OK] {incident['incident_id']} -> {evaluation.get('total')}")
-        except Exception as e:
-            print(f"[ERR] {incident['incident_id']}: {e}", file=sys.stderr)
-            if args.fail_fast:
-                raise
-            results.append(
-                {
-                    "incident_id": incident["incident_id"],
-                    "summary": incident["summary"],
-                    "total": None,
-                    "clarity": None,
-                    "depth": None,
-                    "evidence": None,
-                    "corrective": None,
-                    "preventive": None,
-                    "executive_summary": f"ERROR: {e}",
-                }
+            results = score_incidents(
+                client,
+                incidents,
+                concurrency=args.concurrency,
+                fail_fast=args.fail_fast,
+                stages=stages,
+                stage_concurrency=stage_concurrency,
+                pack=args.pack,
+                previous=previous,
             )
-
-    res_df = pd.DataFrame(results)
+            for result in results:
+                ckpt.write(json.dumps(result, ensure_ascii=False) + "\n")
+                ckpt.flush()
+        except KeyboardInterrupt:
+            interrupted = True
+            print("\nInterrupted - writing partial results (continue with --resume)", file=sys.stderr)
+
+    call_sink.close()
+    if args.prometheus:
+        collector.write_prometheus(args.prometheus)
+
+    res_df = checkpoint_df(read_checkpoint(checkpoint))
     results_csv = outdir / "results.csv"
     res_df.to_csv(results_csv, index=False)
 
@@ -135,6 +783,103 @@ def main() -> int:
     top = valid.sort_values("total", ascending=False).head(5)
     bottom = valid.sort_values("total", ascending=True).head(5)
 
+    quality = client.output_stats.summary()
+
+    m = collector.summary()
+    flights = client.inflight.stats()
+    phase_total = m["load_ms"] + m["prompt_eval_ms"] + m["eval_ms"]
+
+    def share(ms: float) -> str:
+        return f"{ms / phase_total:.0%}" if phase_total else "-"
+
+    limit_note = ""
+    if args.adaptive:
+        limits = ", ".join(f"`{host}` {h['limit']} (peak {h['limit_max']})" for host, h in m["hosts"].items() if host)
+        limit_note = f"- Adaptive concurrency limit at the end: {limits or '-'}\n"
+    stream_note = "- Note: --stream stops early, so Ollama's server timings are not available\n" if args.stream else ""
+    latency_md = f"""## LLM Latency & Throughput (this run)
+- Calls: {m["calls"]} (errors: {m["errors"]}, retries: {m["retries"]})
+- Latency per call: p50 **{m["latency_p50_ms"] / 1000:.1f}s**, p95 **{m["latency_p95_ms"] / 1000:.1f}s**, p99 **{m["latency_p99_ms"] / 1000:.1f}s**, max {m["latency_max_ms"] / 1000:.1f}s
+- Generation: {m["eval_tokens"]} tokens at **{m["eval_tokens_per_s"]:.1f} tok/s**
+- Prompt processing: {m["prompt_tokens"]} tokens at {m["prompt_tokens_per_s"]:.1f} tok/s
+- Server time split: load {share(m["load_ms"])}, prompt {share(m["prompt_eval_ms"])}, generation {share(m["eval_ms"])}
+- Model load events: {m["model_loads"]} ({m["load_ms"] / 1000:.1f}s total)
+- Identical requests coalesced onto one in flight: {flights["hits"]} (generations run: {flights["misses"]})
+{limit_note}{stream_note}
+"""
+
+    delta_md = ""
+    if args.previous:
+        delta_md = (
+            f"**Unchanged since `{args.previous}` (scores reused):** {DELTA_STATS['reused']}\n"
+            f"**New or changed (scored now):** {len(res_df) - len(done) - DELTA_STATS['reused']}\n"
+        )
+
+    hosts_md = ""
+    if len(client.hosts) > 1:
+        lines = [
+            "## Ollama Hosts",
+            "| Host | Calls | Failed attempts | p50 latency | Tokens generated | Ejections |",
+            "|---|---|---|---|---|---|",
+        ]
+        for h in client.hosts.stats():
+            hm = m["hosts"].get(h["host"], {})
+            lines.append(
+                f"| `{h['host']}` | {hm.get('calls', 0)} | {h['errors']} | "
+                f"{hm.get('latency_p50_ms', 0.0) / 1000:.1f}s | {hm.get('eval_tokens', 0)} | {h['ejections']} |"
+            )
+        hosts_md = "\n".join(lines) + "\n\n"
+
+    pack_md = ""
+    if args.pack > 1:
+        pack_md = (
+            f"## Packed Evaluation\n- Incidents per request: {args.pack}\n"
+            f"- Requests: {PACK_STATS['packs']} for {PACK_STATS['packed']} incidents\n"
+            f"- Fallback to single calls (over the context budget, ID missing or invalid): {PACK_STATS['fallback']}\n\n"
+        )
+
+    dedup_md = ""
+    if dedup_index is not None:
+        dedup_md = (
+            f"## Near-Duplicate Clustering\n- Similarity threshold: {args.dedup} (MinHash over RCA text)\n"
+            f"- Clusters: {dedup_index.clusters}\n"
+            f"- Incidents that took their cluster representative's result (no model call): "
+            f"{DEDUP_STATS['propagated']}\n\n"
+        )
+
+    budget_md = ""
+    if "input_tokens" in res_df.columns:
+        tok = res_df[res_df["input_tokens"].notna()]
+        trimmed = tok[tok["input_tokens"] > tok["input_tokens_sent"]]
+        if len(trimmed):
+            budget_md = (
+                f"## Input Budget\n- Incidents trimmed to the field budgets: {len(trimmed)} of {len(tok)}\n"
+                f"- Input tokens of trimmed incidents (estimated): {int(trimmed['input_tokens'].sum())} -> "
+                f"{int(trimmed['input_tokens_sent'].sum())}\n"
+                f"- Largest incident sent: {int(tok['input_tokens_sent'].max())} tokens "
+                f"(largest in the export: {int(tok['input_tokens'].max())})\n\n"
+            )
+
+    triage_md = ""
+    if args.triage:
+        triage_md = triage_report(res_df, args.triage_low, args.triage_high)
+
+    stages_md = ""
+    if len(stages) > 1:
+        lines = [f"## Pipeline Stages\n- Stages: {', '.join(stages)}"]
+        if "critic_confidence" in res_df.columns:
+            crit = res_df["critic_confidence"].fillna("").astype(str)
+            ok = crit[~crit.str.startswith("ERROR:") & (crit != "")]
+            counts = ", ".join(f"{k}: {v}" for k, v in ok.value_counts().items()) or "-"
+            lines.append(f"- Critic reviews: {len(ok)} (confidence {counts}), errors: {int(crit.str.startswith('ERROR:').sum())}")
+        if "improved_root_cause" in res_df.columns:
+            imp = res_df["improved_root_cause"].fillna("").astype(str)
+            lines.append(
+                f"- Improved RCAs: {int((~imp.str.startswith('ERROR:') & (imp != '')).sum())}, "
+                f"errors: {int(imp.str.startswith('ERROR:').sum())}"
+            )
+        stages_md = "\n".join(lines) + "\n\n"
+
     def md_table(df_: pd.DataFrame) -> str:
         if df_.empty:
             return "_(no data)_"
@@ -148,20 +893,29 @@ def main() -> int:
 **Model:** `{args.model}`
 **Host:** `{args.host}`
 **Rows processed:** {len(res_df)}
-**Started (UTC):** {started}
+**Already in checkpoint (--resume):** {len(done)}
+{delta_md}**Started (UTC):** {started}
 **Finished (UTC):** {finished}
 
 ## Summary Metrics
 - Average score: **{avg:.1f}**
 - Median score (P50): **{p50:.1f}**
 
-## Top 5 (Highest Scores)
+## Model Output Quality (this run)
+- LLM answers checked: {quality["calls"]}
+- Valid as returned: {quality["ok"]}
+- Repaired locally (clamped scores, recomputed total, ...): {quality["repaired"]} ({quality["repair_rate"]:.1%})
+- Unusable (ERROR rows): {quality["failed"]} ({quality["failure_rate"]:.1%})
+
+{latency_md}{hosts_md}{pack_md}{dedup_md}{budget_md}{triage_md}{stages_md}## Top 5 (Highest Scores)
 {md_table(top)}
 
 ## Bottom 5 (Lowest Scores)
 {md_table(bottom)}
 
 ## Output Files
+- Checkpoint (JSONL): `{checkpoint}`
+- LLM call telemetry (JSONL): `{calls_jsonl}`
 - Results CSV: `{results_csv}`
 - This report: `{report_md}`
 """
@@ -169,7 +923,17 @@ def main() -> int:
 
     print(f"\nWrote: {results_csv}")
     print(f"Wrote: {report_md}")
-    return 0
+    if dedup_index is not None:
+        print(f"Dedup: {DEDUP_STATS['propagated']} near-duplicates took their cluster's result")
+    if args.triage:
+        sent = TRIAGE_STATS["llm"] + TRIAGE_STATS["audit"]
+        print(f"Triage: {TRIAGE_STATS['settled']} settled by heuristics, {sent} sent to the model")
+    if args.previous:
+        print(f"Delta: {DELTA_STATS['reused']} unchanged incidents reused from {args.previous}")
+    print(f"Output: {quality['repaired']} repaired, {quality['failed']} failed of {quality['calls']}")
+    if cache is not None:
+        print(f"Cache: {cache.hits} hits, {cache.misses} misses ({cache.path})")
+    return 130 if interrupted else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,4 @@
+"""
+Offline benchmark harness: a fake Ollama server, a synthetic incident generator
+and scenarios that write comparable JSON results (see benchmarks/run.py).
+"""
@@ -0,0 +1,232 @@
+"""
+Local stand-in for the Ollama HTTP API (/api/generate, /api/chat, /api/embed) for offline benchmarks.
+Latency, jitter, server-side parallelism, error rate and malformed-output rate are configurable.
+
+    python -m benchmarks.fake_ollama --port 11500 --latency 0.5 --jitter 0.2 --parallel 4
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+SCORE_KEYS = ["clarity", "depth", "evidence", "corrective", "preventive"]
+EMBED_DIM = 256
+
+
+class FakeOllamaConfig:
+    def __init__(
+        self,
+        latency_s: float = 0.2,
+        jitter_s: float = 0.0,
+        parallel: int = 4,
+        error_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        seed: Optional[int] = None,
+        embed_latency_s: float = 0.01,
+    ):
+        self.latency_s = latency_s
+        self.jitter_s = jitter_s
+        # like OLLAMA_NUM_PARALLEL: requests beyond this queue up
+        self.parallel = parallel
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.embed_latency_s = embed_latency_s
+        self.rng = random.Random(seed)
+        self.slots = threading.Semaphore(parallel)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.embedded = 0
+
+    def random(self) -> float:
+        with self.lock:
+            return self.rng.random()
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    if "messages" in body:
+        return "\n".join(m.get("content", "") for m in body["messages"])
+    return (body.get("system") or "") + "\n" + (body.get("prompt") or "")
+
+
+def _scores(rng: random.Random) -> Dict[str, int]:
+    return {k: rng.randint(4, 18) for k in SCORE_KEYS}
+
+
+def fake_answer(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Schema-conforming answer for whichever prompt type this is."""
+    if "critic agent" in prompt:
+        return {
+            "top_risks": ["Root cause not backed by logs"],
+            "missing_evidence_requests": ["Error log excerpt with timestamps"],
+            "confidence": rng.choice(["low", "medium", "high"]),
+        }
+    if "improvement agent" in prompt:
+        return {
+            "improved_root_cause": "Root cause [NEEDED: log excerpt/timestamp]",
+            "improved_resolution": "Resolution with verification steps",
+            "improved_preventive_action": "Add alerting and a regression test",
+            "notes": ["Evidence missing"],
+        }
+
+    def evaluation() -> Dict[str, Any]:
+        scores = _scores(rng)
+        return {
+            "scores": scores,
+            "total": sum(scores.values()),
+            "strengths": ["Clear summary"],
+            "gaps": ["Little evidence"],
+            "improvements": ["Attach logs"],
+            "executive_summary": "Synthetic evaluation from the fake Ollama server.",
+        }
+
+    packed_ids = re.findall(r"### Incident ID: (.*)", prompt)
+    if packed_ids:
+        return {"results": [{"incident_id": i.strip(), **evaluation()} for i in packed_ids]}
+    return evaluation()
+
+
+def fake_embedding(text: str) -> List[float]:
+    """Hashed bag of words: texts sharing words get similar vectors, like a real embedding model."""
+    vec = [0.0] * EMBED_DIM
+    for word in re.findall(r"[a-z]+", text.lower()):
+        h = zlib.crc32(word.encode("utf-8"))
+        vec[h % EMBED_DIM] += 1.0 if h & 0x80000000 else -1.0
+    return vec
+
+
+def _timings(latency_s: float, prompt: str, answer: str) -> Dict[str, Any]:
+    prompt_tokens = max(1, len(prompt) // 4)
+    eval_tokens = max(1, len(answer) // 4)
+    return {
+        "total_duration": int(latency_s * 1e9),
+        "load_duration": 2_000_000,
+        "prompt_eval_count": prompt_tokens,
+        "prompt_eval_duration": int(latency_s * 0.3 * 1e9),
+        "eval_count": eval_tokens,
+        "eval_duration": int(latency_s * 0.65 * 1e9),
+    }
+
+
+def make_handler(cfg: FakeOllamaConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def _send_json(self, status: int, obj: Dict[str, Any]) -> None:
+            body = json.dumps(obj).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_chunk(self, obj: Dict[str, Any]) -> None:
+            data = (json.dumps(obj) + "\n").encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if self.path == "/api/embed":
+                texts = body.get("input") or []
+                texts = [texts] if isinstance(texts, str) else texts
+                with cfg.lock:
+                    cfg.requests += 1
+                    cfg.embedded += len(texts)
+                with cfg.slots:
+                    time.sleep(cfg.embed_latency_s)
+                    self._send_json(200, {"model": body.get("model"), "embeddings": [fake_embedding(t) for t in texts]})
+                return
+            if self.path not in ("/api/generate", "/api/chat"):
+                self._send_json(404, {"error": f"unknown endpoint {self.path}"})
+                return
+            with cfg.lock:
+                cfg.requests += 1
+                rng = random.Random(cfg.rng.random())
+
+            with cfg.slots:
+                latency = max(0.0, cfg.latency_s + rng.uniform(-cfg.jitter_s, cfg.jitter_s))
+                time.sleep(latency)
+                if rng.random() < cfg.error_rate:
+                    self._send_json(500, {"error": "fake server error"})
+                    return
+                prompt = _prompt_text(body)
+                answer = json.dumps(fake_answer(prompt, rng))
+                if rng.random() < cfg.malformed_rate:
+                    answer = "Here is the result: " + answer[: len(answer) // 2]
+                self._respond(body, prompt, answer, latency)
+
+        def _respond(self, body: Dict[str, Any], prompt: str, answer: str, latency: float) -> None:
+            chat = self.path == "/api/chat"
+
+            def text_field(text: str) -> Tuple[str, Any]:
+                return ("message", {"role": "assistant", "content": text}) if chat else ("response", text)
+
+            stats = _timings(latency, prompt, answer)
+            if not body.get("stream", True):
+                key, value = text_field(answer)
+                self._send_json(200, {"model": body.get("model"), key: value, "done": True, **stats})
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for i in range(0, len(answer), 16):
+                    key, value = text_field(answer[i : i + 16])
+                    self._write_chunk({"model": body.get("model"), key: value, "done": False})
+                key, value = text_field("")
+                self._write_chunk({"model": body.get("model"), key: value, "done": True, **stats})
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # client stopped reading early (streaming early stop)
+                pass
+
+    return Handler
+
+
+def start_server(cfg: FakeOllamaConfig, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Starts the fake server in a daemon thread; returns (server, base URL)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(cfg))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Fake Ollama server for offline benchmarks")
+    p.add_argument("--port", type=int, default=11500)
+    p.add_argument("--latency", type=float, default=0.2, help="Seconds per request")
+    p.add_argument("--jitter", type=float, default=0.0, help="+/- seconds of uniform jitter")
+    p.add_argument("--parallel", type=int, default=4, help="Concurrent requests served (OLLAMA_NUM_PARALLEL)")
+    p.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 500")
+    p.add_argument("--malformed-rate", type=float, default=0.0, help="Share of answers with broken JSON")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--embed-latency", type=float, default=0.01, help="Seconds per /api/embed request")
+    args = p.parse_args()
+
+    cfg = FakeOllamaConfig(
+        args.latency, args.jitter, args.parallel, args.error_rate, args.malformed_rate, args.seed, args.embed_latency
+    )
+    server, url = start_server(cfg, args.port)
+    print(f"Fake Ollama listening on {url} (CTRL + C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,343 @@
+"""
+Offline benchmark scenarios against the fake Ollama server; results go to one JSON file
+per run (commit, parameters, metrics) so runs can be compared across commits.
+
+    python -m benchmarks.run batch --rows 10000 --limit 500 --concurrency 4
+    python -m benchmarks.run mcp --rows 100000
+    python -m benchmarks.run memory --rows 1000000
+    python -m benchmarks.run compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.fake_ollama import FakeOllamaConfig, start_server
+from benchmarks.synth_incidents import write_csv
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = ROOT / "benchmarks" / "data"
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def git_info() -> Dict[str, Any]:
+    def git(*args: str) -> str:
+        try:
+            return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ""
+
+    return {"commit": git("rev-parse", "--short", "HEAD"), "dirty": bool(git("status", "--porcelain", "--", "*.py"))}
+
+
+def dataset(rows: int, log_lines: int) -> Path:
+    """Synthetic CSV for `rows`, generated once and reused across runs."""
+    path = DATA_DIR / f"incidents_{rows}_{log_lines}.csv"
+    if not path.exists():
+        write_csv(str(path), rows, seed=0, log_lines=log_lines)
+    return path
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    from telemetry import _percentile
+
+    s = sorted(values)
+    return {
+        "p50_ms": round(_percentile(s, 0.50), 3),
+        "p95_ms": round(_percentile(s, 0.95), 3),
+        "max_ms": round(s[-1], 3) if s else 0.0,
+    }
+
+
+def fake_server(args: argparse.Namespace):
+    cfg = FakeOllamaConfig(
+        latency_s=args.latency,
+        jitter_s=args.jitter,
+        parallel=args.server_parallel,
+        error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate,
+        seed=0,
+    )
+    server, url = start_server(cfg)
+    return cfg, server, url
+
+
+def child_peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def scenario_batch(args: argparse.Namespace) -> Dict[str, Any]:
+    """End-to-end batch.py run as a subprocess: incidents/s, LLM latency, peak RSS."""
+    from telemetry import MetricsCollector
+
+    csv_path = dataset(args.rows, args.log_lines)
+    cfg, server, url = fake_server(args)
+    try:
+        with tempfile.TemporaryDirectory() as outdir:
+            cmd = [
+                sys.executable,
+                str(ROOT / "batch.py"),
+                "--csv", str(csv_path),
+                "--outdir", outdir,
+                "--host", url,
+                "--model", "fake",
+                "--limit", str(args.limit),
+                "--concurrency", str(args.concurrency),
+                "--pack", str(args.pack),
+                "--stages", args.stages,
+                "--no-cache",
+            ]  # fmt: skip
+            if args.stream:
+                cmd.append("--stream")
+            if args.adaptive:
+                cmd.append("--adaptive")
+            t0 = time.perf_counter()
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            wall = time.perf_counter() - t0
+            if proc.returncode != 0:
+                raise RuntimeError(f"batch.py exited with {proc.returncode}: {proc.stderr[-2000:]}")
+
+            collector = MetricsCollector()
+            with open(Path(outdir) / "llm_calls.jsonl", encoding="utf-8") as f:
+                for line in f:
+                    collector(json.loads(line))
+            with open(Path(outdir) / "results.jsonl", encoding="utf-8") as f:
+                rows = [json.loads(line) for line in f if line.strip()]
+    finally:
+        server.shutdown()
+
+    llm = collector.summary()
+    return {
+        "rows_in_csv": args.rows,
+        "incidents": len(rows),
+        "errors": sum(1 for r in rows if r.get("total") is None),
+        "wall_s": round(wall, 3),
+        "incidents_per_s": round(len(rows) / wall, 3) if wall else None,
+        "server_requests": cfg.requests,
+        "llm_calls": llm["calls"],
+        "llm_errors": llm["errors"],
+        "llm_retries": llm["retries"],
+        "llm_latency_p50_ms": llm["latency_p50_ms"],
+        "llm_latency_p95_ms": llm["latency_p95_ms"],
+        "peak_rss_mb": child_peak_rss_mb(),
+    }
+
+
+class _BenchContext:
+    """Minimal stand-in for the MCP request Context (progress and log notifications)."""
+
+    async def report_progress(self, progress: float, total: float = None) -> None:
+        pass
+
+    async def info(self, message: str) -> None:
+        pass
+
+
+def scenario_mcp(args: argparse.Namespace) -> Dict[str, Any]:
+    """In-process MCP tool latency: CSV load, indexed lookup, single and bulk evaluation."""
+    csv_path = dataset(args.rows, args.log_lines)
+    cfg, server, url = fake_server(args)
+    # mcp_server reads its settings at import time
+    os.environ.update(
+        RCA_CSV_PATH=str(csv_path),
+        OLLAMA_HOST=url,
+        OLLAMA_MODEL="fake",
+        RCA_CACHE="0",
+        RCA_MAX_INFLIGHT=str(args.concurrency),
+    )
+    import mcp_server
+
+    cols = dict(
+        incident_id_col="issue_key",
+        summary_col="summary",
+        description_col="description",
+        root_cause_col="root_cause",
+        resolution_col="resolution",
+        preventive_action_col="preventive_action",
+    )
+
+    def timed(fn: Callable[[], Any]) -> float:
+        t0 = time.perf_counter()
+        fn()
+        return (time.perf_counter() - t0) * 1000
+
+    try:
+        tracemalloc.start()
+        load_ms = timed(mcp_server.load_df)
+        _, load_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        ids = mcp_server.load_df()["issue_key"].astype(str).tolist()
+        rng = random.Random(0)
+        sample = [rng.choice(ids) for _ in range(args.lookups)]
+        first_lookup_ms = timed(lambda: mcp_server.get_incident(incident_id=sample[0], **cols))
+        lookups = [timed(lambda i=i: mcp_server.get_incident(incident_id=i, **cols)) for i in sample]
+        reload_ms = timed(mcp_server.load_df)
+
+        evals = [
+            timed(lambda i=i: asyncio.run(mcp_server.evaluate_incident_by_id(incident_id=i, **cols)))
+            for i in sample[: args.evals]
+        ]
+        t0 = time.perf_counter()
+        bulk = asyncio.run(mcp_server.evaluate_incidents_bulk(_BenchContext(), incident_ids=sample[: args.bulk]))
+        bulk_ms = (time.perf_counter() - t0) * 1000
+    finally:
+        server.shutdown()
+
+    return {
+        "rows_in_csv": args.rows,
+        "load_df_ms": round(load_ms, 3),
+        "load_df_peak_mb": round(load_peak / 2**20, 1),
+        "load_df_cached_ms": round(reload_ms, 3),
+        "get_incident_first_ms": round(first_lookup_ms, 3),
+        "get_incident": percentiles(lookups),
+        "evaluate_incident_by_id": percentiles(evals),
+        "evaluate_incidents_bulk": {
+            "incidents": len(bulk["results"]),
+            "evaluated": bulk["stats"]["evaluated"],
+            "wall_ms": round(bulk_ms, 3),
+        },
+    }
+
+
+def scenario_memory(args: argparse.Namespace) -> Dict[str, Any]:
+    """Peak Python heap for a full read_csv vs. the chunked reader batch.py uses."""
+    from incident_io import iter_csv_chunks, read_csv
+
+    csv_path = dataset(args.rows, args.log_lines)
+    cols = ["issue_key", "summary", "description", "root_cause", "resolution", "preventive_action"]
+    result: Dict[str, Any] = {"rows_in_csv": args.rows, "csv_mb": round(csv_path.stat().st_size / 2**20, 1)}
+
+    def measure(name: str, fn: Callable[[], int]) -> None:
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        rows = fn()
+        wall = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result[name] = {
+            "rows": rows,
+            "wall_s": round(wall, 3),
+            "rows_per_s": round(rows / wall, 1) if wall else None,
+            "peak_mb": round(peak / 2**20, 1),
+        }
+
+    measure("read_csv", lambda: len(read_csv(str(csv_path), usecols=cols)))
+    measure("iter_csv_chunks", lambda: sum(len(c) for c in iter_csv_chunks(str(csv_path), cols, args.chunksize)))
+    return result
+
+
+SCENARIOS = {"batch": scenario_batch, "mcp": scenario_mcp, "memory": scenario_memory}
+
+
+def _flatten(obj: Any, prefix: str = "") -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            out.update(_flatten(v, f"{prefix}{k}."))
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        out[prefix[:-1]] = obj
+    return out
+
+
+def compare(a_path: str, b_path: str) -> str:
+    """Side-by-side numeric metrics of two result files (b relative to a)."""
+    a = json.loads(Path(a_path).read_text(encoding="utf-8"))
+    b = json.loads(Path(b_path).read_text(encoding="utf-8"))
+    fa, fb = _flatten(a["metrics"]), _flatten(b["metrics"])
+    lines = [
+        f"{a['scenario']}: {a['git']['commit']} -> {b['git']['commit']}",
+        f"{'metric':<44}{'before':>14}{'after':>14}{'change':>10}",
+    ]
+    for key in sorted(set(fa) | set(fb)):
+        va, vb = fa.get(key), fb.get(key)
+        change = f"{(vb - va) / va * 100:+.1f}%" if va and vb is not None else ""
+        lines.append(f"{key:<44}{'' if va is None else va:>14}{'' if vb is None else vb:>14}{change:>10}")
+    return "\n".join(lines)
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Offline RCA benchmarks (fake Ollama, synthetic data)")
+    sub = p.add_subparsers(dest="scenario", required=True)
+
+    cmp = sub.add_parser("compare", help="Compare two result files")
+    cmp.add_argument("before")
+    cmp.add_argument("after")
+
+    for name, fn in SCENARIOS.items():
+        s = sub.add_parser(name, help=fn.__doc__.splitlines()[0])
+        s.add_argument("--rows", type=int, default=1000, help="Rows in the synthetic CSV (1k..1M)")
+        s.add_argument("--log-lines", type=int, default=0, help="Up to N log lines per description")
+        s.add_argument("--out", default="", help="Result path (default: benchmarks/results/<ts>-<scenario>-<commit>.json)")
+        if name == "memory":
+            s.add_argument("--chunksize", type=int, default=5000)
+            continue
+        s.add_argument("--latency", type=float, default=0.05, help="Fake server seconds per request")
+        s.add_argument("--jitter", type=float, default=0.0)
+        s.add_argument("--server-parallel", type=int, default=4, help="Requests the fake server serves at once")
+        s.add_argument("--error-rate", type=float, default=0.0)
+        s.add_argument("--malformed-rate", type=float, default=0.0)
+        s.add_argument("--concurrency", type=int, default=4)
+        if name == "batch":
+            s.add_argument("--limit", type=int, default=200, help="Incidents to score (0 = all rows)")
+            s.add_argument("--pack", type=int, default=1)
+            s.add_argument("--stages", default="eval")
+            s.add_argument("--stream", action="store_true")
+            s.add_argument("--adaptive", action="store_true", help="batch.py --adaptive (--concurrency is the ceiling)")
+        else:
+            s.add_argument("--lookups", type=int, default=1000, help="get_incident calls")
+            s.add_argument("--evals", type=int, default=10, help="Sequential evaluate_incident_by_id calls")
+            s.add_argument("--bulk", type=int, default=20, help="Incidents in one evaluate_incidents_bulk call")
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    if args.scenario == "compare":
+        print(compare(args.before, args.after))
+        return 0
+
+    params = {k: v for k, v in vars(args).items() if k not in ("scenario", "out")}
+    metrics = SCENARIOS[args.scenario](args)
+    git = git_info()
+    started = datetime.now(timezone.utc)
+    result = {
+        "scenario": args.scenario,
+        "timestamp": started.isoformat(timespec="seconds"),
+        "git": git,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+        "metrics": metrics,
+    }
+    out = Path(args.out) if args.out else RESULTS_DIR / (
+        f"{started:%Y%m%dT%H%M%S}-{args.scenario}-{git['commit'] or 'nogit'}.json"
+    )
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    print(json.dumps(result, indent=2))
+    print(f"Saved {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
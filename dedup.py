@@ -0,0 +1,140 @@
+import re
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# RCA fields that make two incidents "the same write-up"
+RCA_FIELDS = ["root_cause", "resolution", "preventive_action"]
+
+NUM_PERM = 64
+SHINGLE_WORDS = 3
+# (bands, rows) splits of the signature for LSH; more rows per band = fewer, closer candidates
+_BAND_LAYOUTS = [(32, 2), (16, 4), (8, 8), (4, 16)]
+
+_NON_WORD = re.compile(r"[^\w]+")
+_DIGITS = re.compile(r"\d+")
+
+_K1 = np.uint64(0x9E3779B97F4A7C15)
+_K2 = np.uint64(0xBF58476D1CE4E5B9)
+
+
+def _mix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # order-sensitive combination of two uint64 hash arrays
+    return ((a * _K1) ^ b) * _K2
+
+
+def normalize(text: str) -> str:
+    """Lowercase, numbers folded to 0 (IDs, timestamps), punctuation dropped."""
+    return _NON_WORD.sub(" ", _DIGITS.sub("0", text.lower())).strip()
+
+
+def rca_text(incident: Dict[str, Any]) -> str:
+    return " | ".join(str(incident.get(f, "")) for f in RCA_FIELDS)
+
+
+def band_layout(threshold: float, num_perm: int = NUM_PERM) -> Tuple[int, int]:
+    """Split with the highest LSH threshold (1/b)^(1/r) that is still below `threshold`."""
+    best = _BAND_LAYOUTS[0]
+    for bands, rows in _BAND_LAYOUTS:
+        if bands * rows == num_perm and (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+class NearDuplicateIndex:
+    """
+    Streaming near-duplicate clustering of RCA texts with MinHash + LSH.
+    Texts are shingled into word 3-grams; signatures are computed for a whole
+    block at once with NumPy. Each text joins the first earlier representative
+    whose estimated Jaccard similarity is >= threshold, otherwise it becomes a
+    representative itself, so clusters form in input order and memory grows with
+    the number of clusters only.
+    """
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = NUM_PERM, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = band_layout(threshold, num_perm)
+        rng = np.random.default_rng(seed)
+        # multiply-shift hashing: odd 64-bit multipliers, top 32 bits of a*x + b
+        self._a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+        self._rep_keys: List[str] = []
+        self._rep_sigs: List[np.ndarray] = []
+
+    @property
+    def clusters(self) -> int:
+        return len(self._rep_keys)
+
+    def signatures(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), num_perm) uint32 MinHash signatures."""
+        words = [normalize(t).split() for t in texts]
+        lengths = np.array([len(w) for w in words], dtype=np.int64)
+        flat = [w for ws in words for w in ws]
+        h = pd.util.hash_array(np.array(flat, dtype=object)) if flat else np.empty(0, dtype=np.uint64)
+        starts = np.cumsum(lengths) - lengths
+        doc = np.arange(len(texts))
+
+        with np.errstate(over="ignore"):
+            # word 3-grams over the flat word list, minus those crossing into the next text
+            n = max(len(h) - SHINGLE_WORDS + 1, 0)
+            owner = np.repeat(doc, lengths)[:n]
+            keep = np.arange(n) + SHINGLE_WORDS <= (starts + lengths)[owner]
+            tri = _mix(_mix(h[:n], h[1 : n + 1]), h[2 : n + 2])[keep]
+            # texts of one or two words are one shingle; empty texts share the constant 0
+            one, two, empty = lengths == 1, lengths == 2, lengths == 0
+            values = np.concatenate(
+                [
+                    tri,
+                    h[starts[one]],
+                    _mix(h[starts[two]], h[starts[two] + 1]),
+                    np.zeros(int(empty.sum()), dtype=np.uint64),
+                ]
+            )
+            owners = np.concatenate([owner[keep], doc[one], doc[two], doc[empty]])
+            order = np.argsort(owners, kind="stable")
+            values = values[order]
+            counts = np.bincount(owners, minlength=len(texts))
+            seg_starts = np.cumsum(counts) - counts
+
+            sig = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+            for p in range(self.num_perm):
+                hashed = (values * self._a[p] + self._b[p]) >> np.uint64(32)
+                sig[:, p] = np.minimum.reduceat(hashed, seg_starts)
+        return sig
+
+    def assign(self, key: str, sig: np.ndarray) -> str:
+        """Representative key for `key` (its own key when it starts a new cluster)."""
+        band_keys = [sig[i * self.rows : (i + 1) * self.rows].tobytes() for i in range(self.bands)]
+        seen = set()
+        for band, bkey in zip(self._buckets, band_keys):
+            for rep in band.get(bkey, ()):
+                if rep in seen:
+                    continue
+                seen.add(rep)
+                if np.count_nonzero(self._rep_sigs[rep] == sig) >= self.threshold * self.num_perm:
+                    return self._rep_keys[rep]
+        rep = len(self._rep_keys)
+        self._rep_keys.append(key)
+        self._rep_sigs.append(sig)
+        for band, bkey in zip(self._buckets, band_keys):
+            band.setdefault(bkey, []).append(rep)
+        return key
+
+
+def with_clusters(
+    incidents: Iterable[Dict[str, Any]], index: NearDuplicateIndex, block: int = 2000
+) -> Iterator[Dict[str, Any]]:
+    """Adds cluster_id (incident_id of the cluster representative) to each incident, block by block."""
+    it = iter(incidents)
+    while True:
+        group = list(islice(it, block))
+        if not group:
+            return
+        sigs = index.signatures([rca_text(inc) for inc in group])
+        for inc, sig in zip(group, sigs):
+            yield {**inc, "cluster_id": index.assign(inc["incident_id"], sig)}
+
@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from dedup import RCA_FIELDS
+from incident_io import ensure_cols, read_csv
+from rca_scoring import OllamaClient, trim_text
+
+EMBED_MODEL = "nomic-embed-text"
+DEFAULT_INDEX_DIR = ".cache/embeddings"
+# Texts per /api/embed request
+EMBED_BATCH = 64
+# Embedding models have short contexts (nomic-embed-text: 2048 tokens); long pastes add noise anyway
+EMBED_TOKEN_BUDGET = 512
+# Rows copied from the old matrix per step while rewriting, bounds memory for large indexes
+_COPY_ROWS = 50_000
+
+# texts -> one vector per text (e.g. OllamaClient.embed)
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+
+def embedding_text(incident: Dict[str, Any]) -> str:
+    """Summary plus the RCA fields, trimmed to EMBED_TOKEN_BUDGET."""
+    parts = [incident.get("summary", "")] + [incident.get(f, "") for f in RCA_FIELDS]
+    return trim_text("\n".join(str(p) for p in parts if p), EMBED_TOKEN_BUDGET)
+
+
+def text_fingerprint(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\x1f{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def index_dir_for(csv_path: str, base: str = DEFAULT_INDEX_DIR) -> Path:
+    """One index directory per CSV file, so several exports don't overwrite each other's vectors."""
+    return Path(base) / hashlib.sha256(os.path.abspath(csv_path).encode("utf-8")).hexdigest()[:16]
+
+
+class EmbeddingIndex:
+    """
+    Embeddings of incident RCA texts in a memory-mapped float32 matrix
+    (<dir>/vectors-<generation>.npy, rows L2-normalized) with the incident ID and
+    text fingerprint of every row in <dir>/rows.json, which also names the current
+    matrix file, so replacing rows.json switches both at once. update() re-embeds only rows
+    whose fingerprint is not in the index yet; search() is one matrix-vector
+    product over the mapped matrix.
+    """
+
+    def __init__(self, directory: Path, model: str = EMBED_MODEL):
+        self.dir = Path(directory)
+        self.model = model
+        self.ids: List[str] = []
+        self.fingerprints: List[str] = []
+        self.vectors: Optional[np.ndarray] = None
+        self._pos: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def _rows_path(self) -> Path:
+        return self.dir / "rows.json"
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _load(self) -> None:
+        try:
+            meta = json.loads(self._rows_path.read_text(encoding="utf-8"))
+            vectors = np.load(self.dir / meta["vectors"], mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return
+        rows = meta.get("rows", [])
+        # another embedding model: start over
+        if meta.get("model") != self.model or len(rows) != len(vectors):
+            return
+        self._set(rows, vectors)
+
+    def _set(self, rows: List[List[str]], vectors: Optional[np.ndarray]) -> None:
+        self.ids = [r[0] for r in rows]
+        self.fingerprints = [r[1] for r in rows]
+        self.vectors = vectors
+        self._pos = {}
+        for i, incident_id in enumerate(self.ids):
+            self._pos.setdefault(incident_id, i)
+
+    def update(
+        self, incidents: List[Dict[str, Any]], embed: EmbedFn, batch: int = EMBED_BATCH, workers: int = 1
+    ) -> Dict[str, int]:
+        """
+        Makes the index match incidents (in their order). Texts already in the
+        index keep their vector; new or changed ones are embedded in batches of
+        `batch`, `workers` requests at a time.
+        """
+        ids = [str(inc["incident_id"]) for inc in incidents]
+        texts = [embedding_text(inc) for inc in incidents]
+        fps = [text_fingerprint(self.model, t) for t in texts]
+        with self._lock:
+            if fps == self.fingerprints and ids == self.ids:
+                return {"rows": len(ids), "embedded": 0, "reused": len(ids)}
+            known = {fp: i for i, fp in enumerate(self.fingerprints)}
+            # rows (in the new order) each text that is not in the index yet goes to
+            targets: Dict[str, List[int]] = {}
+            for i, fp in enumerate(fps):
+                if fp not in known:
+                    targets.setdefault(fp, []).append(i)
+            pending = list(targets)
+            chunks = [pending[i : i + batch] for i in range(0, len(pending), batch)]
+
+            def embed_chunk(chunk: List[str]) -> np.ndarray:
+                vecs = np.asarray(embed([texts[targets[fp][0]] for fp in chunk]), dtype=np.float32)
+                if len(vecs) != len(chunk):
+                    raise ValueError(f"got {len(vecs)} embeddings for {len(chunk)} texts")
+                norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+                return vecs / np.where(norms == 0, 1, norms)
+
+            # the first answer tells the embedding size of a new index
+            first = embed_chunk(chunks[0]) if chunks else None
+            old_dim = self.vectors.shape[1] if self.vectors is not None else 0
+            dim = first.shape[1] if first is not None else old_dim
+            if self.vectors is not None and dim != old_dim:
+                raise ValueError(f"embedding size changed from {old_dim} to {dim}; use a new index dir")
+
+            self.dir.mkdir(parents=True, exist_ok=True)
+            name = f"vectors-{uuid.uuid4().hex[:12]}.npy"
+            out = np.lib.format.open_memmap(self.dir / name, mode="w+", dtype=np.float32, shape=(len(ids), dim))
+            src = np.array([known.get(fp, -1) for fp in fps], dtype=np.int64)
+            reuse = np.flatnonzero(src >= 0)
+            for start in range(0, len(reuse), _COPY_ROWS):
+                part = reuse[start : start + _COPY_ROWS]
+                out[part] = self.vectors[src[part]]
+
+            def store(chunk: List[str], vecs: np.ndarray) -> None:
+                for fp, vec in zip(chunk, vecs):
+                    out[targets[fp]] = vec
+
+            if first is not None:
+                store(chunks[0], first)
+                # answers are written to the mapped file as they arrive, never all held in memory
+                with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                    for chunk, vecs in zip(chunks[1:], pool.map(embed_chunk, chunks[1:])):
+                        store(chunk, vecs)
+            out.flush()
+            del out
+
+            rows = [[i, fp] for i, fp in zip(ids, fps)]
+            tmp_rows = self._rows_path.with_suffix(".tmp")
+            tmp_rows.write_text(json.dumps({"model": self.model, "vectors": name, "rows": rows}), encoding="utf-8")
+            os.replace(tmp_rows, self._rows_path)
+            self._set(rows, np.load(self.dir / name, mmap_mode="r"))
+            # previous matrix, or leftovers of an interrupted update
+            for stale in self.dir.glob("vectors-*.npy"):
+                if stale.name != name:
+                    try:
+                        stale.unlink()
+                    except OSError:
+                        # still mapped by another process on Windows; removed by a later update
+                        pass
+            return {"rows": len(ids), "embedded": len(pending), "reused": int(len(reuse))}
+
+    def vector(self, incident_id: str) -> Optional[np.ndarray]:
+        pos = self._pos.get(str(incident_id))
+        return None if pos is None or self.vectors is None else np.asarray(self.vectors[pos])
+
+    def search(self, query: np.ndarray, k: int = 5, exclude: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Top-k (incident_id, cosine similarity), best first."""
+        with self._lock:
+            vectors, ids = self.vectors, self.ids
+            skip = self._pos.get(str(exclude)) if exclude is not None else None
+        if vectors is None or not len(ids) or k <= 0:
+            return []
+        q = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        scores = vectors @ (q / norm if norm else q)
+        if skip is not None:
+            scores[skip] = -np.inf
+        k = min(k, len(scores) - (skip is not None))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(ids[i], round(float(scores[i]), 4)) for i in top]
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Precompute the similar-incident embedding index for a CSV export")
+    p.add_argument("--csv", required=True, help="Path to CSV export")
+    p.add_argument("--host", default=os.getenv("OLLAMA_HOST", "http://localhost:11434"), help="Ollama host(s)")
+    p.add_argument("--embed-model", default=os.getenv("RCA_EMBED_MODEL", EMBED_MODEL), help="Ollama embedding model")
+    p.add_argument("--index-dir", default=os.getenv("RCA_INDEX_DIR", DEFAULT_INDEX_DIR))
+    p.add_argument("--batch", type=int, default=EMBED_BATCH, help="Texts per embedding request")
+    p.add_argument("--workers", type=int, default=2, help="Embedding requests in flight")
+    p.add_argument("--col-id", default="issue_key")
+    p.add_argument("--col-summary", default="summary")
+    p.add_argument("--col-root-cause", default="root_cause")
+    p.add_argument("--col-resolution", default="resolution")
+    p.add_argument("--col-preventive", default="preventive_action")
+    args = p.parse_args()
+
+    cols = {
+        "incident_id": args.col_id,
+        "summary": args.col_summary,
+        "root_cause": args.col_root_cause,
+        "resolution": args.col_resolution,
+        "preventive_action": args.col_preventive,
+    }
+    df = read_csv(args.csv)
+    try:
+        ensure_cols(list(df.columns), list(cols.values()))
+    except ValueError as e:
+        print(f"[ERR] {e}", file=sys.stderr)
+        return 2
+    incidents = df[list(cols.values())].set_axis(list(cols), axis=1).to_dict("records")
+
+    client = OllamaClient(model=args.embed_model, host=args.host)
+    index = EmbeddingIndex(index_dir_for(args.csv, args.index_dir), args.embed_model)
+    t0 = time.perf_counter()
+    stats = index.update(incidents, client.embed, batch=args.batch, workers=args.workers)
+    print(
+        f"Index: {stats['rows']} incidents, {stats['embedded']} embedded, {stats['reused']} reused "
+        f"in {time.perf_counter() - t0:.1f}s ({index.dir})"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
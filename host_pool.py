@@ -0,0 +1,253 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+# Consecutive failures (connection error, timeout, 5xx) before a host is ejected
+MAX_FAILURES = 2
+# First ejection lasts EJECT_S; repeated ejections double it up to MAX_EJECT_S
+EJECT_S = 30.0
+MAX_EJECT_S = 300.0
+# Weight of the newest sample in the per-host latency average
+EWMA_ALPHA = 0.3
+
+# Adaptive concurrency: back off when a window's mean latency exceeds
+# LATENCY_TOLERANCE x the uncongested baseline, or on timeouts / 5xx / connection errors
+LATENCY_TOLERANCE = 1.5
+BACKOFF = 0.7
+# Upward drift of the baseline per window, so a slower prompt mix is not read as congestion forever
+BASELINE_DRIFT = 0.01
+
+# (host, old limit, new limit, reason)
+LimitCallback = Callable[[str, int, int, str], None]
+
+
+def parse_hosts(hosts: Union[str, Sequence[str]]) -> List[str]:
+    """'http://a:11434, http://b:11434' or a list -> normalized base URLs."""
+    if isinstance(hosts, str):
+        hosts = hosts.replace(";", ",").split(",")
+    urls = [h.strip().rstrip("/") for h in hosts if h and h.strip()]
+    if not urls:
+        raise ValueError("at least one Ollama host is required")
+    return urls
+
+
+class AdaptiveLimit:
+    """
+    AIMD concurrency limit for one host. Evaluated once per window (as many
+    completions as the current limit): doubles while latency stays flat (slow
+    start), then grows by one per window; shrinks by BACKOFF when latency rises
+    above LATENCY_TOLERANCE x baseline or a request fails with an overload signal.
+    """
+
+    def __init__(self, max_limit: int, initial: int = 1, min_limit: int = 1):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.value = float(min(max(initial, min_limit), self.max_limit))
+        self.slow_start = True
+        self.baseline_ms: Optional[float] = None
+        self._window_n = 0
+        self._window_ms = 0.0
+        self._peak_inflight = 0
+        self._decreased_in_window = False
+        # completions to ignore after a decrease: those requests were admitted under the old limit
+        self._ignore = 0
+
+    @property
+    def limit(self) -> int:
+        return int(self.value)
+
+    def on_start(self, inflight: int) -> None:
+        self._peak_inflight = max(self._peak_inflight, inflight)
+
+    def _reset_window(self) -> None:
+        self._window_n = 0
+        self._window_ms = 0.0
+        self._peak_inflight = 0
+        self._decreased_in_window = False
+
+    def _set(self, value: float) -> None:
+        self.value = min(max(value, float(self.min_limit)), float(self.max_limit))
+
+    def _decrease(self) -> None:
+        self._ignore = self.limit
+        self.slow_start = False
+        self._set(self.value * BACKOFF)
+        self._reset_window()
+        self._decreased_in_window = True
+
+    def on_overload(self) -> Optional[str]:
+        """Timeout / 5xx / connection error. Returns the reason when the limit changed."""
+        if self._decreased_in_window:
+            # one decrease per window, a burst of failures is one congestion event
+            return None
+        self._decrease()
+        return "overload"
+
+    def on_success(self, latency_ms: float) -> Optional[str]:
+        if self._ignore > 0:
+            self._ignore -= 1
+            return None
+        self._window_n += 1
+        self._window_ms += latency_ms
+        if self._window_n < max(self.limit, 1):
+            return None
+        mean_ms = self._window_ms / self._window_n
+        used_limit = self._peak_inflight >= self.limit
+        decreased = self._decreased_in_window
+        self._reset_window()
+        if self.baseline_ms is None:
+            self.baseline_ms = mean_ms
+        if mean_ms > LATENCY_TOLERANCE * self.baseline_ms:
+            if self.limit <= self.min_limit:
+                # nothing left to queue behind: this is the host's latency now
+                self.baseline_ms = mean_ms
+                return None
+            if decreased:
+                return None
+            self._decrease()
+            return "latency"
+        self.baseline_ms = min(mean_ms, self.baseline_ms * (1 + BASELINE_DRIFT))
+        if not used_limit:
+            # the caller never filled the limit, so latency says nothing about a higher one
+            return None
+        self._set(self.value * 2 if self.slow_start else self.value + 1)
+        return "latency flat"
+
+
+class _Backend:
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.latency_ms: Optional[float] = None
+        self.failures = 0
+        # ejections in a row (sets the ejection length) and over the lifetime
+        self.ejections = 0
+        self.ejected_total = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.limiter: Optional[AdaptiveLimit] = None
+
+
+class HostPool:
+    """
+    Picks an Ollama backend per request: the one with the fewest outstanding
+    requests, weighted by its observed latency, so faster boxes get more work.
+    Hosts failing MAX_FAILURES times in a row are skipped for a while and then
+    tried again with a single request.
+    With adaptive_max > 0 each host also gets an AdaptiveLimit (1..adaptive_max)
+    and acquire blocks while every host is at its limit.
+    """
+
+    def __init__(
+        self,
+        hosts: Union[str, Sequence[str]],
+        adaptive_max: int = 0,
+        on_limit_change: Optional[LimitCallback] = None,
+    ):
+        self.backends = [_Backend(url) for url in parse_hosts(hosts)]
+        self.adaptive = adaptive_max > 0
+        if self.adaptive:
+            for b in self.backends:
+                b.limiter = AdaptiveLimit(adaptive_max)
+        self.on_limit_change = on_limit_change
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._next = 0
+
+    @property
+    def urls(self) -> List[str]:
+        return [b.url for b in self.backends]
+
+    def __len__(self) -> int:
+        return len(self.backends)
+
+    def acquire(self) -> str:
+        """Reserves a slot on the best backend and returns its base URL (pair with release)."""
+        with self._cond:
+            while True:
+                live = self._candidates()
+                if live:
+                    break
+                # all hosts at their adaptive limit; ejections may expire meanwhile
+                self._cond.wait(timeout=1.0)
+            known = [b.latency_ms for b in live if b.latency_ms is not None]
+            # unmeasured hosts look as fast as the fastest one, so they get tried early
+            default_ms = min(known) if known else 1.0
+            # rotate the scan start so ties spread over hosts instead of piling on the first
+            n = len(live)
+            start = self._next % n
+            self._next += 1
+            best = min(
+                (live[(start + i) % n] for i in range(n)),
+                key=lambda b: (b.outstanding + 1) * (b.latency_ms if b.latency_ms is not None else default_ms),
+            )
+            best.outstanding += 1
+            best.requests += 1
+            if best.limiter is not None:
+                best.limiter.on_start(best.outstanding)
+            return best.url
+
+    def _candidates(self) -> List[_Backend]:
+        now = time.monotonic()
+        live = [b for b in self.backends if b.ejected_until <= now]
+        if not live:
+            # everything is ejected: try the host that comes back first
+            live = [min(self.backends, key=lambda b: b.ejected_until)]
+        return [b for b in live if b.limiter is None or b.outstanding < b.limiter.limit]
+
+    def limit(self, url: str) -> Optional[int]:
+        """Current adaptive limit of a host (None without adaptive concurrency)."""
+        with self._lock:
+            b = next(b for b in self.backends if b.url == url)
+            return b.limiter.limit if b.limiter is not None else None
+
+    def release(self, url: str, ok: bool, latency_ms: Optional[float] = None) -> None:
+        """ok=False means connection error, timeout or 5xx (counts towards ejection and backs off the limit)."""
+        with self._cond:
+            b = next(b for b in self.backends if b.url == url)
+            b.outstanding = max(0, b.outstanding - 1)
+            old = b.limiter.limit if b.limiter is not None else 0
+            reason = None
+            if ok:
+                b.failures = 0
+                b.ejections = 0
+                if latency_ms is not None:
+                    b.latency_ms = (
+                        latency_ms if b.latency_ms is None else (1 - EWMA_ALPHA) * b.latency_ms + EWMA_ALPHA * latency_ms
+                    )
+                    if b.limiter is not None:
+                        reason = b.limiter.on_success(latency_ms)
+            else:
+                if b.limiter is not None:
+                    reason = b.limiter.on_overload()
+                self._count_failure(b)
+            self._cond.notify_all()
+            new = b.limiter.limit if b.limiter is not None else 0
+        if reason and new != old and self.on_limit_change is not None:
+            self.on_limit_change(url, old, new, reason)
+
+    def _count_failure(self, b: _Backend) -> None:
+        b.errors += 1
+        b.failures += 1
+        if b.failures >= MAX_FAILURES and len(self.backends) > 1:
+            b.ejections += 1
+            b.ejected_total += 1
+            b.ejected_until = time.monotonic() + min(EJECT_S * 2 ** (b.ejections - 1), MAX_EJECT_S)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "host": b.url,
+                    "requests": b.requests,
+                    "errors": b.errors,
+                    "outstanding": b.outstanding,
+                    "latency_ewma_ms": round(b.latency_ms, 1) if b.latency_ms is not None else None,
+                    "ejected_for_s": round(max(0.0, b.ejected_until - now), 1),
+                    "ejections": b.ejected_total,
+                    "limit": b.limiter.limit if b.limiter is not None else None,
+                }
+                for b in self.backends
+            ]
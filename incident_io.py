@@ -0,0 +1,134 @@
+import codecs
+from pathlib import Path
+from typing import IO, Iterator, List, Optional, Union
+
+import pandas as pd
+
+CsvSource = Union[str, Path, IO[bytes]]
+
+DEFAULT_CHUNKSIZE = 5000
+_SNIFF_BYTES = 1 << 20
+
+
+def _read_sample(src: CsvSource, n: int) -> bytes:
+    if hasattr(src, "read"):
+        pos = src.tell()
+        sample = src.read(n)
+        src.seek(pos)
+        return sample
+    with open(src, "rb") as f:
+        return f.read(n)
+
+
+def sniff_encoding(src: CsvSource) -> str:
+    """
+    Picks utf-8 (with or without BOM) or latin-1 from the first MB of the file,
+    so the CSV is parsed once instead of retrying the whole file on UnicodeDecodeError.
+    """
+    sample = _read_sample(src, _SNIFF_BYTES)
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    try:
+        # final=False: a multi-byte char cut off at the sample boundary is fine
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def _read_kwargs(encoding: str) -> dict:
+    # Everything as text; empty cells become "" instead of NaN (replaces .fillna("")).
+    # Stray non-utf-8 bytes past the sniffed sample are replaced rather than
+    # failing the run half way through a multi-GB export.
+    return {
+        "encoding": encoding,
+        "encoding_errors": "replace",
+        "dtype": str,
+        "keep_default_na": False,
+    }
+
+
+def read_header(src: CsvSource, encoding: Optional[str] = None) -> List[str]:
+    encoding = encoding or sniff_encoding(src)
+    cols = list(pd.read_csv(src, nrows=0, **_read_kwargs(encoding)).columns)
+    if hasattr(src, "seek"):
+        src.seek(0)
+    return cols
+
+
+def read_csv(src: CsvSource, usecols: Optional[List[str]] = None) -> pd.DataFrame:
+    """Reads a whole CSV in a single pass (UI / MCP server)."""
+    df = pd.read_csv(src, usecols=usecols, **_read_kwargs(sniff_encoding(src)))
+    if hasattr(src, "seek"):
+        src.seek(0)
+    return df
+
+
+def iter_csv_chunks(
+    src: CsvSource,
+    usecols: List[str],
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    limit: int = 0,
+    engine: str = "c",
+) -> Iterator[pd.DataFrame]:
+    """
+    Yields the CSV in DataFrame chunks with only `usecols` loaded, so peak memory
+    depends on chunksize rather than file size. limit > 0 stops reading early.
+    engine="pyarrow" streams record batches through pyarrow.csv (optional dependency).
+    """
+    encoding = sniff_encoding(src)
+    cols = list(dict.fromkeys(usecols))
+
+    if engine == "pyarrow":
+        chunks = _iter_pyarrow_chunks(src, cols, encoding)
+    else:
+        chunks = pd.read_csv(
+            src,
+            usecols=cols,
+            chunksize=chunksize,
+            nrows=limit if limit > 0 else None,
+            **_read_kwargs(encoding),
+        )
+
+    remaining = limit if limit > 0 else None
+    for chunk in chunks:
+        if remaining is not None:
+            if remaining <= 0:
+                break
+            chunk = chunk.head(remaining)
+            remaining -= len(chunk)
+        yield chunk
+
+
+def _iter_pyarrow_chunks(src: CsvSource, cols: List[str], encoding: str) -> Iterator[pd.DataFrame]:
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError as e:
+        raise RuntimeError("engine 'pyarrow' requires `pip install pyarrow`") from e
+
+    reader = pacsv.open_csv(
+        src,
+        read_options=pacsv.ReadOptions(encoding=encoding.replace("-sig", ""), block_size=16 << 20),
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=cols,
+            column_types={c: pa.string() for c in cols},
+            strings_can_be_null=False,
+        ),
+    )
+    for batch in reader:
+        yield batch.to_pandas()
+
+
+def records(chunks: Iterator[pd.DataFrame]) -> Iterator[dict]:
+    """Flattens DataFrame chunks into row dicts."""
+    for chunk in chunks:
+        yield from chunk.to_dict("records")
+
+
+def ensure_cols(available: List[str], cols: List[str]) -> None:
+    missing = [c for c in cols if c not in available]
+    if missing:
+        raise ValueError(f"Missing required columns in CSV: {missing}\nAvailable: {available}")
+
@@ -1,26 +1,108 @@
+import asyncio
 import os
+import statistics
+import sys
+import threading
+import time
 import pandas as pd
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
+from embedding_index import EMBED_MODEL, DEFAULT_INDEX_DIR, EmbeddingIndex, index_dir_for
+from incident_io import read_csv
+from llm_cache import cache_from_env
 from rca_scoring import OllamaClient, evaluate_incident
+from telemetry import hooks_from_env
 
 # MCP server
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
 
 mcp = FastMCP("RCA Quality Analyst")
 
 CSV_PATH = os.getenv("RCA_CSV_PATH", "./data/example_incidents.csv")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
+# comma-separated list to spread calls over several Ollama servers
 OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_CHAT = os.getenv("OLLAMA_CHAT", "0") == "1"
+# Cap on concurrent model calls; match OLLAMA_NUM_PARALLEL (summed over all hosts)
+MAX_INFLIGHT = int(os.getenv("RCA_MAX_INFLIGHT", "2"))
+# RCA_ADAPTIVE=1: per-host limit follows latency/errors, RCA_MAX_INFLIGHT becomes the ceiling
+ADAPTIVE = os.getenv("RCA_ADAPTIVE", "0") == "1"
+# Similar-incident search: Ollama embedding model and where the per-CSV vector files live
+EMBED_MODEL = os.getenv("RCA_EMBED_MODEL", EMBED_MODEL)
+INDEX_DIR = os.getenv("RCA_INDEX_DIR", DEFAULT_INDEX_DIR)
 
 _df_cache: Optional[pd.DataFrame] = None
+_df_signature: Optional[Tuple[int, int]] = None
+_id_indexes: Dict[str, Dict[str, int]] = {}
+_df_lock = threading.Lock()
+_llm_slots = asyncio.Semaphore(MAX_INFLIGHT)
+# held by every model call on a worker thread (run_llm and index embedding), so together they stay within MAX_INFLIGHT
+_llm_calls = threading.BoundedSemaphore(MAX_INFLIGHT)
+_client: Optional[OllamaClient] = None
+_index: Optional[EmbeddingIndex] = None
+# (CSV signature, column mapping) the index was last synced with
+_index_state: Optional[Tuple[Any, ...]] = None
+_index_lock = threading.Lock()
+
+
+def get_client() -> OllamaClient:
+    # one pooled client for the server's lifetime
+    global _client
+    if _client is None:
+        _client = OllamaClient(
+            model=OLLAMA_MODEL,
+            host=OLLAMA_HOST,
+            cache=cache_from_env(),
+            keep_alive=OLLAMA_KEEP_ALIVE,
+            use_chat=OLLAMA_CHAT,
+            metrics=hooks_from_env(),
+            adaptive_concurrency=MAX_INFLIGHT if ADAPTIVE else 0,
+            on_limit_change=_log_limit_change,
+        )
+    return _client
+
+
+def _log_limit_change(host: str, old: int, new: int, reason: str) -> None:
+    # stdout carries the MCP protocol
+    print(f"[LIMIT] {host}: {old} -> {new} ({reason})", file=sys.stderr)
+
+
+def _file_signature(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def load_df_signed() -> Tuple[pd.DataFrame, Tuple[int, int]]:
+    """
+    Cached CSV and the file signature it was read at; reloaded (and id indexes
+    dropped) when the file's mtime or size changes.
+    """
+    global _df_cache, _df_signature
+    sig = _file_signature(CSV_PATH)
+    with _df_lock:
+        if _df_cache is None or sig != _df_signature:
+            _df_cache = read_csv(CSV_PATH)
+            _df_signature = sig
+            _id_indexes.clear()
+        return _df_cache, _df_signature
 
 
 def load_df() -> pd.DataFrame:
-    global _df_cache
-    if _df_cache is None:
-        _df_cache = pd.read_csv(CSV_PATH).fillna("")
-    return _df_cache
+    return load_df_signed()[0]
+
+
+def id_index(df: pd.DataFrame, id_col: str) -> Dict[str, int]:
+    """Lazily built id -> row position map per id column of `df` (first occurrence wins)."""
+    with _df_lock:
+        index = _id_indexes.get(id_col) if df is _df_cache else None
+        if index is None:
+            ids = df[id_col].astype(str).reset_index(drop=True)
+            ids = ids[~ids.duplicated()]
+            index = dict(zip(ids.tolist(), ids.index.tolist()))
+            if df is _df_cache:
+                _id_indexes[id_col] = index
+        return index
 
 
 @mcp.tool()
@@ -51,10 +133,10 @@ def get_incident(
 ) -> Dict[str, Any]:
     """Fetch a single incident by id using explicit column mapping."""
     df = load_df()
-    hit = df[df[incident_id_col].astype(str) == str(incident_id)]
-    if hit.empty:
+    pos = id_index(df, incident_id_col).get(str(incident_id))
+    if pos is None:
         return {"error": f"Incident {incident_id} not found"}
-    r = hit.iloc[0]
+    r = df.iloc[pos]
     return {
         "incident_id": str(r[incident_id_col]),
         "summary": str(r[summary_col]),
@@ -65,8 +147,22 @@ def get_incident(
     }
 
 
+async def run_llm(fn, *args: Any) -> Any:
+    """
+    Runs a blocking LLM call in a worker thread, at most MAX_INFLIGHT at a time,
+    so the stdio event loop keeps serving fast tools meanwhile.
+    """
+    async with _llm_slots:
+        return await asyncio.to_thread(_call_llm, fn, *args)
+
+
+def _call_llm(fn, *args: Any) -> Any:
+    with _llm_calls:
+        return fn(*args)
+
+
 @mcp.tool()
-def evaluate_incident_by_id(
+async def evaluate_incident_by_id(
     incident_id: str,
     incident_id_col: str,
     summary_col: str,
@@ -76,7 +172,9 @@ def evaluate_incident_by_id(
     preventive_action_col: str,
 ) -> Dict[str, Any]:
     """Evaluate RCA for one incident by ID."""
-    incident = get_incident(
+    # a changed CSV is re-read here: keep that off the event loop
+    incident = await asyncio.to_thread(
+        get_incident,
         incident_id=incident_id,
         incident_id_col=incident_id_col,
         summary_col=summary_col,
@@ -88,8 +186,175 @@ def evaluate_incident_by_id(
     if "error" in incident:
         return incident
 
-    client = OllamaClient(model=OLLAMA_MODEL, host=OLLAMA_HOST)
-    return evaluate_incident(client, incident)
+    return await run_llm(evaluate_incident, get_client(), incident)
+
+
+@mcp.tool()
+async def evaluate_incidents_bulk(
+    ctx: Context,
+    incident_ids: Optional[List[str]] = None,
+    text_filter: str = "",
+    limit: int = 50,
+    incident_id_col: str = "issue_key",
+    summary_col: str = "summary",
+    description_col: str = "description",
+    root_cause_col: str = "root_cause",
+    resolution_col: str = "resolution",
+    preventive_action_col: str = "preventive_action",
+) -> Dict[str, Any]:
+    """
+    Evaluate many incidents in one call, in parallel on the server.
+    Select by incident_ids, or by text_filter (case-insensitive match on summary/root cause),
+    at most `limit` incidents. Sends a progress notification per finished incident and
+    returns per-incident totals plus summary statistics.
+    """
+    df = await asyncio.to_thread(load_df)
+    if incident_ids:
+        ids = [str(i) for i in incident_ids][:limit]
+    else:
+        sel = df
+        if text_filter:
+            needle = text_filter.lower()
+            mask = df[summary_col].astype(str).str.lower().str.contains(needle, regex=False) | df[
+                root_cause_col
+            ].astype(str).str.lower().str.contains(needle, regex=False)
+            sel = df[mask]
+        ids = sel[incident_id_col].astype(str).head(limit).tolist()
+
+    client = get_client()
+    colmap = dict(
+        incident_id_col=incident_id_col,
+        summary_col=summary_col,
+        description_col=description_col,
+        root_cause_col=root_cause_col,
+        resolution_col=resolution_col,
+        preventive_action_col=preventive_action_col,
+    )
+
+    async def one(incident_id: str) -> Dict[str, Any]:
+        incident = await asyncio.to_thread(get_incident, incident_id=incident_id, **colmap)
+        if "error" in incident:
+            return {"incident_id": incident_id, "total": None, "error": incident["error"]}
+        try:
+            evaluation = await run_llm(evaluate_incident, client, incident)
+        except Exception as e:
+            return {"incident_id": incident_id, "total": None, "error": str(e)}
+        return {"incident_id": incident_id, "total": evaluation.get("total")}
+
+    tasks = [asyncio.ensure_future(one(i)) for i in ids]
+    done = 0
+    for fut in asyncio.as_completed(tasks):
+        res = await fut
+        done += 1
+        await ctx.report_progress(done, len(tasks))
+        await ctx.info(f"{res['incident_id']}: {res['total'] if res['total'] is not None else res['error']}")
+
+    results = [t.result() for t in tasks]
+    totals = [r["total"] for r in results if r["total"] is not None]
+    stats: Dict[str, Any] = {"requested": len(ids), "evaluated": len(totals), "failed": len(ids) - len(totals)}
+    if totals:
+        stats.update(
+            mean=round(statistics.fmean(totals), 1),
+            median=statistics.median(totals),
+            min=min(totals),
+            max=max(totals),
+            stdev=round(statistics.pstdev(totals), 1),
+        )
+    return {"results": results, "stats": stats}
+
+
+def sync_index(
+    df: pd.DataFrame, signature: Tuple[int, int], cols: Dict[str, str]
+) -> Tuple[EmbeddingIndex, Optional[Dict[str, int]]]:
+    """
+    Embedding index for `df` (as returned by load_df_signed with `signature`), brought
+    up to date when the file or the column mapping changed since the last sync (only
+    changed rows are re-embedded). Embedding requests share the MAX_INFLIGHT model slots.
+    Returns the index and the update stats (None when it was already current).
+    """
+    global _index, _index_state
+    with _index_lock:
+        if _index is None:
+            _index = EmbeddingIndex(index_dir_for(CSV_PATH, INDEX_DIR), EMBED_MODEL)
+        state = (signature, tuple(sorted(cols.items())))
+        if state == _index_state:
+            return _index, None
+        incidents = df[list(cols.values())].set_axis(list(cols), axis=1).to_dict("records")
+        client = get_client()
+
+        def embed(texts: List[str]) -> List[List[float]]:
+            return _call_llm(client.embed, texts, EMBED_MODEL)
+
+        stats = _index.update(incidents, embed, workers=MAX_INFLIGHT)
+        _index_state = state
+        return _index, stats
+
+
+@mcp.tool()
+async def find_similar_incidents(
+    incident_id: str = "",
+    text: str = "",
+    k: int = 5,
+    incident_id_col: str = "issue_key",
+    summary_col: str = "summary",
+    root_cause_col: str = "root_cause",
+    resolution_col: str = "resolution",
+    preventive_action_col: str = "preventive_action",
+) -> Dict[str, Any]:
+    """
+    Top-k incidents whose RCA text (summary, root cause, resolution, preventive action)
+    is most similar to an incident's (by incident_id) or to free text, by cosine similarity
+    of embeddings. The index is built on first use and refreshed when the CSV changes;
+    precompute it for large exports with `python embedding_index.py --csv ...`.
+    """
+    cols = {
+        "incident_id": incident_id_col,
+        "summary": summary_col,
+        "root_cause": root_cause_col,
+        "resolution": resolution_col,
+        "preventive_action": preventive_action_col,
+    }
+    df, signature = await asyncio.to_thread(load_df_signed)
+    missing = [c for c in cols.values() if c not in df.columns]
+    if missing:
+        return {"error": f"Missing columns: {missing}"}
+    if not incident_id and not text:
+        return {"error": "Pass incident_id or text"}
+    # index refreshes can take a while: keep them off the event loop; each embedding request takes a model slot
+    index, synced = await asyncio.to_thread(sync_index, df, signature, cols)
+
+    if incident_id:
+        query = index.vector(incident_id)
+        if query is None:
+            return {"error": f"Incident {incident_id} not found"}
+    else:
+        client = get_client()
+        query = (await run_llm(client.embed, [text], EMBED_MODEL))[0]
+    t0 = time.perf_counter()
+    hits = index.search(query, k=k, exclude=incident_id or None)
+    pos = id_index(df, incident_id_col)
+    results = [
+        {"incident_id": i, "summary": str(df.iloc[pos[i]][summary_col]) if i in pos else "", "similarity": score}
+        for i, score in hits
+    ]
+    return {
+        "results": results,
+        "search_ms": round((time.perf_counter() - t0) * 1000, 1),
+        "index": {"incidents": len(index), "model": EMBED_MODEL, **({"synced": synced} if synced else {})},
+    }
+
+
+@mcp.tool()
+def llm_stats() -> Dict[str, Any]:
+    """LLM client counters since server start: calls, tokens, coalesced duplicate requests, cache and hosts."""
+    client = get_client()
+    return {
+        "usage": dict(client.usage),
+        "coalesced": client.inflight.stats(),
+        "cache": client.cache.stats() if client.cache is not None else None,
+        "hosts": client.hosts.stats(),
+        "output_quality": client.output_stats.summary(),
+    }
 
 
 def main():
@@ -1,48 +1,79 @@
-EVAL_PROMPT = """\
-You are a strict incident RCA reviewer for software/IT incidents.
-Rate the RCA quality using the rubric below. Be consistent and conservative.
+import hashlib
+import json
+import textwrap
 
-Context:
-- Incident ID: {incident_id}
-- Summary: {summary}
-- Description: {description}
-- Root Cause: {root_cause}
-- Resolution/Fix: {resolution}
-- Preventive Action: {preventive_action}
+# Prompt layout: each prompt is a static *_SYSTEM part (role, rubric, output schema,
+# rules) followed by a *_INPUT template with the incident data. The static part is
+# an identical prefix on every call (or the system message on /api/chat), so the
+# inference server can reuse its KV cache instead of re-processing it per incident.
+# *_SYSTEM strings are sent verbatim; only *_INPUT templates go through str.format.
 
+# Shared by the single-incident and the packed evaluation prompt, so both score alike
+RUBRIC = """\
 Rubric (0–20 each):
 1) Clarity & structure: Is it readable, well structured, unambiguous?
 2) Root cause depth: Does it identify the underlying cause (not just symptoms)?
 3) Evidence & specificity: Facts, logs, timestamps, components, data vs vague claims.
 4) Corrective action quality: Fix addresses root cause, verified, rollback/monitoring noted.
 5) Preventive action strength: Prevent recurrence (tests, monitoring, process, automation).
+"""
 
-Output MUST be valid JSON only with this schema:
-{{
-  "scores": {{
+EVAL_OBJECT = """\
+{
+  "scores": {
     "clarity": int,
     "depth": int,
     "evidence": int,
     "corrective": int,
     "preventive": int
-  }},
+  },
   "total": int,
   "strengths": [string, ...],
   "gaps": [string, ...],
   "improvements": [string, ...],
   "executive_summary": string
-}}
+}"""
 
-Rules:
+EVAL_RULES = """\
 - Each score is an integer 0..20.
 - total is the sum (0..100).
 - Keep executive_summary <= 60 words.
 """
 
-CRITIC_PROMPT = """\
+EVAL_SYSTEM = f"""\
+You are a strict incident RCA reviewer for software/IT incidents.
+Rate the RCA quality of the incident given at the end using the rubric below. Be consistent and conservative.
+
+{RUBRIC}
+Output MUST be valid JSON only with this schema:
+{EVAL_OBJECT}
+
+Rules:
+{EVAL_RULES}"""
+
+EVAL_INPUT = """\
+Context:
+- Incident ID: {incident_id}
+- Summary: {summary}
+- Description: {description}
+- Root Cause: {root_cause}
+- Resolution/Fix: {resolution}
+- Preventive Action: {preventive_action}
+"""
+
+CRITIC_SYSTEM = """\
 You are the critic agent. Your job: find weak reasoning, missing info, and potential hallucinations.
-Given the evaluation JSON and the original RCA text, list the top 5 risks/uncertainties and what evidence would reduce them.
+Given the original RCA text and its evaluation JSON (at the end), list the top 5 risks/uncertainties and what evidence would reduce them.
 
+Output MUST be valid JSON only:
+{
+  "top_risks": [string, ...],
+  "missing_evidence_requests": [string, ...],
+  "confidence": "low" | "medium" | "high"
+}
+"""
+
+CRITIC_INPUT = """\
 RCA:
 Root Cause: {root_cause}
 Resolution/Fix: {resolution}
@@ -50,31 +81,145 @@ Preventive Action: {preventive_action}
 
 Evaluation JSON:
 {evaluation_json}
-
-Output MUST be valid JSON only:
-{{
-  "top_risks": [string, ...],
-  "missing_evidence_requests": [string, ...],
-  "confidence": "low" | "medium" | "high"
-}}
 """
 
-IMPROVE_PROMPT = """\
-You are an improvement agent. Rewrite the RCA into a stronger version WITHOUT inventing facts.
+IMPROVE_SYSTEM = """\
+You are an improvement agent. Rewrite the RCA given at the end into a stronger version WITHOUT inventing facts.
 If facts are missing, insert clearly marked placeholders like: "[NEEDED: log excerpt/timestamp]".
 
+Output MUST be valid JSON only:
+{
+  "improved_root_cause": string,
+  "improved_resolution": string,
+  "improved_preventive_action": string,
+  "notes": [string, ...]
+}
+"""
+
+IMPROVE_INPUT = """\
 Input:
 - Incident ID: {incident_id}
 - Summary: {summary}
 - Root Cause: {root_cause}
 - Resolution/Fix: {resolution}
 - Preventive Action: {preventive_action}
+"""
 
-Output MUST be valid JSON only:
+# One EVAL_OBJECT per incident, with its ID as the first field
+_PACKED_ENTRY = textwrap.indent('{\n  "incident_id": string,' + EVAL_OBJECT[1:], "    ")
+
+EVAL_PACKED_SYSTEM = f"""\
+You are a strict incident RCA reviewer for software/IT incidents.
+Rate the RCA quality of EACH incident given at the end independently, using the rubric below. Be consistent and conservative.
+
+{RUBRIC}
+Output MUST be valid JSON only with this schema, one entry per incident:
 {{
-  "improved_root_cause": string,
-  "improved_resolution": string,
-  "improved_preventive_action": string,
-  "notes": [string, ...]
+  "results": [
+{_PACKED_ENTRY},
+    ...
+  ]
 }}
+
+Rules:
+- Return exactly one entry per incident, with its Incident ID copied verbatim.
+{EVAL_RULES}"""
+
+EVAL_PACKED_INPUT = """\
+Incidents ({count}):
+{incidents}
+"""
+
+PACKED_INCIDENT = """\
+### Incident ID: {incident_id}
+- Summary: {summary}
+- Description: {description}
+- Root Cause: {root_cause}
+- Resolution/Fix: {resolution}
+- Preventive Action: {preventive_action}
 """
+
+# JSON schemas for Ollama's `format` parameter (structured outputs).
+# They mirror the prose schemas above so the model is constrained to them.
+
+EVAL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scores": {
+            "type": "object",
+            "properties": {
+                "clarity": {"type": "integer", "minimum": 0, "maximum": 20},
+                "depth": {"type": "integer", "minimum": 0, "maximum": 20},
+                "evidence": {"type": "integer", "minimum": 0, "maximum": 20},
+                "corrective": {"type": "integer", "minimum": 0, "maximum": 20},
+                "preventive": {"type": "integer", "minimum": 0, "maximum": 20},
+            },
+            "required": ["clarity", "depth", "evidence", "corrective", "preventive"],
+        },
+        "total": {"type": "integer", "minimum": 0, "maximum": 100},
+        "strengths": {"type": "array", "items": {"type": "string"}},
+        "gaps": {"type": "array", "items": {"type": "string"}},
+        "improvements": {"type": "array", "items": {"type": "string"}},
+        "executive_summary": {"type": "string"},
+    },
+    "required": ["scores", "total", "strengths", "gaps", "improvements", "executive_summary"],
+}
+
+CRITIC_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "top_risks": {"type": "array", "items": {"type": "string"}},
+        "missing_evidence_requests": {"type": "array", "items": {"type": "string"}},
+        "confidence": {"type": "string", "enum": ["low", "medium", "high"]},
+    },
+    "required": ["top_risks", "missing_evidence_requests", "confidence"],
+}
+
+IMPROVE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "improved_root_cause": {"type": "string"},
+        "improved_resolution": {"type": "string"},
+        "improved_preventive_action": {"type": "string"},
+        "notes": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["improved_root_cause", "improved_resolution", "improved_preventive_action", "notes"],
+}
+
+EVAL_PACKED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {"incident_id": {"type": "string"}, **EVAL_SCHEMA["properties"]},
+                "required": ["incident_id"] + EVAL_SCHEMA["required"],
+            },
+        }
+    },
+    "required": ["results"],
+}
+
+# Changes whenever a prompt text or schema above changes; batch.py --previous only
+# reuses scores produced with the same PROMPT_VERSION.
+PROMPT_VERSION = hashlib.sha256(
+    json.dumps(
+        [
+            EVAL_SYSTEM,
+            EVAL_INPUT,
+            CRITIC_SYSTEM,
+            CRITIC_INPUT,
+            IMPROVE_SYSTEM,
+            IMPROVE_INPUT,
+            EVAL_PACKED_SYSTEM,
+            EVAL_PACKED_INPUT,
+            PACKED_INCIDENT,
+            EVAL_SCHEMA,
+            CRITIC_SCHEMA,
+            IMPROVE_SCHEMA,
+            EVAL_PACKED_SCHEMA,
+        ],
+        sort_keys=True,
+    ).encode("utf-8")
+).hexdigest()[:12]
@@ -1,41 +1,636 @@
+import copy
+import hashlib
 import json
+import math
+import re
+import threading
+import time
 import requests
-from typing import Any, Dict
-from prompts import EVAL_PROMPT, CRITIC_PROMPT, IMPROVE_PROMPT
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from host_pool import HostPool, LimitCallback
+from llm_cache import ResponseCache
+from telemetry import MetricsHook, call_record
+from prompts import (
+    EVAL_SYSTEM,
+    EVAL_INPUT,
+    CRITIC_SYSTEM,
+    CRITIC_INPUT,
+    IMPROVE_SYSTEM,
+    IMPROVE_INPUT,
+    EVAL_SCHEMA,
+    CRITIC_SCHEMA,
+    IMPROVE_SCHEMA,
+    EVAL_PACKED_SYSTEM,
+    EVAL_PACKED_INPUT,
+    EVAL_PACKED_SCHEMA,
+    PACKED_INCIDENT,
+)
+from validation import COERCERS, OutputStats, coerce_evaluation
+
+RETRY_STATUS = {500, 502, 503, 504}
+
+PartialCallback = Callable[[Dict[str, Any]], None]
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the
+    function, callers arriving while it runs wait and get a copy of its result
+    (or its exception). hits = callers served by another call, misses = calls run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.hits += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            # callers may modify what they get back
+            return copy.deepcopy(flight.result)
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "in_flight": len(self._flights)}
 
 
 class OllamaClient:
-    def __init__(self, model: str = "llama3.1:8b", host: str = "http://localhost:11434"):
+    """
+    One client per process: holds a pooled keep-alive HTTP session, so reuse it
+    across calls and threads instead of constructing one per request.
+    `host` may list several Ollama servers (comma-separated or a list); each
+    request goes to the least loaded one (see host_pool.HostPool).
+    adaptive_concurrency=N lets each host's in-flight limit float between 1 and N
+    with observed latency and errors; callers may then run up to N requests at once.
+    """
+
+    def __init__(
+        self,
+        model: str = "llama3.1:8b",
+        host: Union[str, Sequence[str]] = "http://localhost:11434",
+        cache: Optional[ResponseCache] = None,
+        keep_alive: Optional[Union[str, int]] = None,
+        stream: bool = False,
+        use_chat: bool = False,
+        max_retries: int = 3,
+        backoff_s: float = 1.0,
+        pool_size: int = 32,
+        metrics: Optional[List[MetricsHook]] = None,
+        adaptive_concurrency: int = 0,
+        on_limit_change: Optional[LimitCallback] = None,
+    ):
         self.model = model
-        self.host = host.rstrip("/")
+        self.hosts = HostPool(host, adaptive_max=adaptive_concurrency, on_limit_change=on_limit_change)
+        self.host = ",".join(self.hosts.urls)
+        self.cache = cache
+        # Ollama unloads idle models after 5 minutes by default; e.g. "30m" or -1 keeps it resident
+        if isinstance(keep_alive, str) and keep_alive.lstrip("-").isdigit():
+            keep_alive = int(keep_alive)
+        self.keep_alive = keep_alive
+        # stream=True stops generation as soon as the JSON object is closed
+        self.stream = stream
+        # use_chat sends the static instructions as a system message on /api/chat
+        self.use_chat = use_chat
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.output_stats = OutputStats()
+        # identical requests in flight at the same time share one generation
+        self.inflight = SingleFlight()
+        # token counts as reported by Ollama (not available for early-stopped streams)
+        self.usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "prompt_eval_ms": 0.0}
+        self._usage_lock = threading.Lock()
+        # per-call telemetry sinks, e.g. telemetry.JsonlSink / MetricsCollector
+        self.metrics_hooks: List[MetricsHook] = list(metrics or [])
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.hosts), pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
-    def generate_json(self, prompt: str, temperature: float = 0.2, timeout_s: int = 180) -> Dict[str, Any]:
+    def _request(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        timeout_s: int = 180,
+        stream: bool = False,
+        call: Optional[Dict[str, Any]] = None,
+    ) -> requests.Response:
+        """
+        POSTs to the Ollama API over the pooled session. Connection errors and
+        5xx responses are retried with exponential backoff; read timeouts and 4xx are not.
+        Every attempt picks a host from self.hosts, so a retry can land on another server.
+        The number of retries and the host used are stored in call when given.
+        A successful streamed response keeps its host slot until the caller has
+        consumed it and calls self.hosts.release (see _stream_text).
         """
-        Calls Ollama /api/generate and tries to parse JSON reliably.
+        call = call if call is not None else {}
+        attempt = 0
+        while True:
+            call["retries"] = attempt
+            host = call["host"] = self.hosts.acquire()
+            call["limit"] = self.hosts.limit(host)
+            t0 = time.perf_counter()
+            try:
+                r = self.session.post(f"{host}{path}", json=payload, timeout=timeout_s, stream=stream)
+            except requests.ConnectionError:
+                self.hosts.release(host, ok=False)
+                if attempt >= self.max_retries:
+                    raise
+            except requests.RequestException:
+                self.hosts.release(host, ok=False)
+                raise
+            else:
+                if stream and r.status_code < 400:
+                    call["host_t0"] = t0
+                    return r
+                failed = r.status_code in RETRY_STATUS
+                self.hosts.release(host, ok=not failed, latency_ms=(time.perf_counter() - t0) * 1000)
+                if not failed or attempt >= self.max_retries:
+                    r.raise_for_status()
+                    return r
+                r.close()
+            attempt += 1
+            time.sleep(self.backoff_s * 2 ** (attempt - 1))
+
+    def post(
+        self, path: str, payload: Dict[str, Any], timeout_s: int = 180, call: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        return self._request(path, payload, timeout_s=timeout_s, call=call).json()
+
+    def _emit(self, record: Dict[str, Any]) -> None:
+        for hook in self.metrics_hooks:
+            try:
+                hook(record)
+            except Exception:
+                # telemetry must never fail a scoring call
+                pass
+
+    def _record_usage(self, data: Dict[str, Any]) -> None:
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            self.usage["prompt_tokens"] += int(data.get("prompt_eval_count") or 0)
+            self.usage["completion_tokens"] += int(data.get("eval_count") or 0)
+            self.usage["prompt_eval_ms"] += (data.get("prompt_eval_duration") or 0) / 1e6
+
+    def _stream_text(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        timeout_s: int,
+        on_partial: Optional[PartialCallback],
+        call: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
         """
-        url = f"{self.host}/api/generate"
-        payload = {
+        Consumes the NDJSON stream and returns the text up to the end of the first
+        top-level JSON object. Closing the connection there makes Ollama stop generating.
+        Also returns the final stats chunk ({} when the stream was cut early).
+        """
+        scanner = JsonObjectScanner(on_partial)
+        final: Dict[str, Any] = {}
+        call = call if call is not None else {}
+        r = self._request(path, {**payload, "stream": True}, timeout_s=timeout_s, stream=True, call=call)
+        host_ok = False
+        try:
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    host_ok = True
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
+                if scanner.feed(response_text(chunk)):
+                    break
+                if chunk.get("done"):
+                    final = chunk
+                    break
+            host_ok = True
+        finally:
+            r.close()
+            latency_ms = (time.perf_counter() - call["host_t0"]) * 1000 if host_ok else None
+            self.hosts.release(call["host"], ok=host_ok, latency_ms=latency_ms)
+        return scanner.text(), final
+
+    def generate_json(
+        self,
+        prompt: str,
+        temperature: float = 0.2,
+        timeout_s: int = 180,
+        on_partial: Optional[PartialCallback] = None,
+        schema: Optional[Dict[str, Any]] = None,
+        system: Optional[str] = None,
+        validate: Optional[Callable[[Any], Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Calls Ollama /api/generate (or /api/chat with use_chat) and tries to parse JSON reliably.
+        `system` is the static instruction prefix: a system message on /api/chat,
+        otherwise prepended to the prompt. A JSON schema is passed as Ollama's
+        `format` to constrain the output.
+        Parsed results are served from / stored in self.cache when one is set.
+        With `validate` (raises ValueError on an unusable answer) only answers that
+        pass are cached, and a cached answer that fails is dropped and generated again.
+        A request identical to one already in flight waits for that one's result
+        instead of generating again (see SingleFlight).
+        In streaming mode on_partial receives the top-level fields parsed so far
+        (only for the caller whose request is actually sent).
+        """
+        options = {"temperature": float(temperature)}
+        key = ResponseCache.make_key(self.model, f"{system or ''}\n{prompt}", {**options, "format": schema})
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                try:
+                    if validate is not None:
+                        validate(cached)
+                    return cached
+                except ValueError:
+                    self.cache.delete(key)
+        return self.inflight.do(
+            key, lambda: self._generate(key, prompt, options, timeout_s, on_partial, schema, system, validate)
+        )
+
+    def embed(self, texts: List[str], model: Optional[str] = None, timeout_s: int = 120) -> List[List[float]]:
+        """Embedding vectors for texts from Ollama /api/embed, one request for the whole list."""
+        payload: Dict[str, Any] = {"model": model or self.model, "input": texts}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        vectors = self.post("/api/embed", payload, timeout_s=timeout_s).get("embeddings")
+        if not isinstance(vectors, list) or len(vectors) != len(texts):
+            raise ValueError(f"/api/embed returned {len(vectors or [])} vectors for {len(texts)} texts")
+        return vectors
+
+    def _generate(
+        self,
+        key: str,
+        prompt: str,
+        options: Dict[str, Any],
+        timeout_s: int,
+        on_partial: Optional[PartialCallback],
+        schema: Optional[Dict[str, Any]],
+        system: Optional[str],
+        validate: Optional[Callable[[Any], Any]] = None,
+    ) -> Dict[str, Any]:
+
+        payload: Dict[str, Any] = {
             "model": self.model,
-            "prompt": prompt,
             "stream": False,
-            "options": {"temperature": float(temperature)},
+            "options": options,
         }
-        r = requests.post(url, json=payload, timeout=timeout_s)
-        r.raise_for_status()
-        text = (r.json().get("response") or "").strip()
+        if self.use_chat:
+            path = "/api/chat"
+            messages = [{"role": "system", "content": system}] if system else []
+            payload["messages"] = messages + [{"role": "user", "content": prompt}]
+        else:
+            path = "/api/generate"
+            payload["prompt"] = f"{system}\n{prompt}" if system else prompt
+        if schema is not None:
+            payload["format"] = schema
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        call: Dict[str, Any] = {"retries": 0}
+        started = time.time()
+        t0 = time.perf_counter()
+        try:
+            if self.stream:
+                text, data = self._stream_text(path, payload, timeout_s, on_partial, call)
+            else:
+                data = self.post(path, payload, timeout_s=timeout_s, call=call)
+                text = response_text(data).strip()
+        except Exception as e:
+            wall_ms = (time.perf_counter() - t0) * 1000
+            self._emit(
+                call_record(
+                    self.model,
+                    path,
+                    started,
+                    wall_ms,
+                    call["retries"],
+                    "error",
+                    error=str(e),
+                    host=call.get("host", ""),
+                    limit=call.get("limit"),
+                )
+            )
+            raise
+        wall_ms = (time.perf_counter() - t0) * 1000
+        self._record_usage(data)
+        self._emit(
+            call_record(
+                self.model, path, started, wall_ms, call["retries"], "ok", data, host=call["host"], limit=call["limit"]
+            )
+        )
+
+        result = parse_json_text(text)
+        if validate is not None:
+            # a bad answer must not be cached, or every retry would read it back
+            validate(result)
+        if self.cache is not None:
+            self.cache.put(key, self.model, result)
+        return result
+
+
+def response_text(data: Dict[str, Any]) -> str:
+    """Generated text of a /api/generate or /api/chat response (or stream chunk)."""
+    if "message" in data:
+        return (data.get("message") or {}).get("content") or ""
+    return data.get("response") or ""
+
+
+def parse_json_text(text: str) -> Dict[str, Any]:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        start = text.find("{")
+        end = text.rfind("}")
+        if start != -1 and end != -1 and end > start:
+            return json.loads(text[start : end + 1])
+        raise
+
 
+class JsonObjectScanner:
+    """
+    Incremental scanner for the first top-level JSON object in streamed text.
+    Tracks nesting outside of strings, reports completed top-level fields to
+    on_partial and tells the caller when the object is closed.
+    """
+
+    def __init__(self, on_partial: Optional[PartialCallback] = None):
+        self.on_partial = on_partial
+        self.buf: list = []
+        self.start = -1
+        self.end = -1
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self._pos = 0
+        self._partial_keys = 0
+
+    def feed(self, piece: str) -> bool:
+        """Adds text; returns True once the top-level object is complete."""
+        if self.end != -1:
+            return True
+        self.buf.append(piece)
+        for ch in piece:
+            pos = self._pos
+            self._pos += 1
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                continue
+            if ch == '"':
+                if self.start != -1:
+                    self.in_string = True
+            elif ch in "{[":
+                if self.start == -1:
+                    if ch != "{":
+                        continue
+                    self.start = pos
+                self.depth += 1
+            elif ch in "}]" and self.start != -1:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.end = pos + 1
+                    return True
+            elif ch == "," and self.depth == 1:
+                self._emit_partial(pos)
+        return False
+
+    def _emit_partial(self, pos: int) -> None:
+        if self.on_partial is None:
+            return
+        text = "".join(self.buf)
         try:
-            return json.loads(text)
+            partial = json.loads(text[self.start : pos] + "}")
         except json.JSONDecodeError:
-            start = text.find("{")
-            end = text.rfind("}")
-            if start != -1 and end != -1 and end > start:
-                return json.loads(text[start : end + 1])
-            raise
+            return
+        if isinstance(partial, dict) and len(partial) > self._partial_keys:
+            self._partial_keys = len(partial)
+            self.on_partial(partial)
+
+    def text(self) -> str:
+        text = "".join(self.buf)
+        if self.start != -1 and self.end != -1:
+            return text[self.start : self.end]
+        return text.strip()
+
+
+# Input budgets per incident field, in estimated tokens (see estimate_tokens).
+# Pasted logs and stack traces beyond these are trimmed before prompting, so prompt
+# evaluation time stays bounded whatever the ticket size.
+FIELD_TOKEN_BUDGETS = {
+    "summary": 100,
+    "description": 1200,
+    "root_cause": 800,
+    "resolution": 500,
+    "preventive_action": 500,
+}
+# Llama-style tokenizers average ~4 characters per token on English; logs (hex IDs,
+# paths, punctuation) tokenize worse, so estimate on the safe side
+CHARS_PER_TOKEN = 3.5
+# Frames kept at the start / end of a collapsed stack trace
+FRAMES_HEAD = 3
+FRAMES_TAIL = 2
+# Share of a head + tail cut that goes to the head (where the error message usually is)
+HEAD_SHARE = 0.7
+# Packed requests must fit the model context: Ollama silently drops the start of a longer
+# prompt (the rubric). 4096 is Ollama's default num_ctx; OLLAMA_CONTEXT_LENGTH raises it
+PACKED_CONTEXT_TOKENS = 4096
+# Answer tokens reserved per incident in a packed request
+PACKED_ANSWER_TOKENS = 300
+
+# Bump when trim_text cuts the same input differently
+TRIM_REVISION = 2
+
+# Changes with the budgets; batch.py --previous only reuses scores trimmed the same way
+BUDGET_VERSION = hashlib.sha256(
+    json.dumps(
+        [FIELD_TOKEN_BUDGETS, CHARS_PER_TOKEN, FRAMES_HEAD, FRAMES_TAIL, HEAD_SHARE, TRIM_REVISION], sort_keys=True
+    ).encode("utf-8")
+).hexdigest()[:12]
+
+# Java / .NET "at x.y(...)", "... 12 more", Python 'File "...", line N', gdb / native "#3 0x..."
+_FRAME = re.compile(
+    r'^\s*(?:at [\w$.<>/:`\[\]-]+\(.*\)|at [\w$.<>]+\.[\w$<>]+ in |\.\.\. \d+ more$|File ".*", line \d+|#\d+ +0x[0-9a-f]+)'
+)
+# Parts of a log line that differ between otherwise identical lines
+# (whole tokens only, so Layer1 / Layer2 stay distinct)
+_VOLATILE = re.compile(r"\b(?:0x[0-9a-f]+|[0-9a-f]{8,}|\d+)\b", re.I)
+
+
+def estimate_tokens(text: str) -> int:
+    """Token estimate without a tokenizer: characters / CHARS_PER_TOKEN."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def collapse_stack_frames(lines: List[str]) -> List[str]:
+    """Keeps the first FRAMES_HEAD and last FRAMES_TAIL frames of each trace, with a count of the rest."""
+    out: List[str] = []
+    run: List[str] = []
+
+    def flush() -> None:
+        if len(run) > FRAMES_HEAD + FRAMES_TAIL + 1:
+            indent = run[FRAMES_HEAD][: len(run[FRAMES_HEAD]) - len(run[FRAMES_HEAD].lstrip())]
+            omitted = len(run) - FRAMES_HEAD - FRAMES_TAIL
+            out.extend(run[:FRAMES_HEAD] + [f"{indent}[... {omitted} frames omitted ...]"] + run[-FRAMES_TAIL:])
+        else:
+            out.extend(run)
+        run.clear()
+
+    for line in lines:
+        if _FRAME.match(line):
+            run.append(line)
+        elif run and run[-1].lstrip().startswith("File ") and line.startswith((" ", "\t")):
+            # source line under a Python frame belongs to it
+            run[-1] = run[-1] + "\n" + line
+        else:
+            flush()
+            out.append(line)
+    flush()
+    return out
 
 
-def evaluate_incident(client: OllamaClient, row: Dict[str, Any]) -> Dict[str, Any]:
-    prompt = EVAL_PROMPT.format(
+def dedupe_lines(lines: List[str]) -> List[str]:
+    """Drops repeats of a line (ignoring numbers, hex IDs and timestamps); the first one gets a count."""
+    counts: Dict[str, int] = {}
+    first: Dict[str, int] = {}
+    out: List[str] = []
+    for line in lines:
+        key = _VOLATILE.sub("#", line.strip())
+        if not key:
+            if out and not out[-1].strip():
+                continue
+            out.append(line)
+            continue
+        if key in counts and not key.startswith("[... "):
+            counts[key] += 1
+            continue
+        counts[key] = 1
+        first[key] = len(out)
+        out.append(line)
+    for key, n in counts.items():
+        if n > 1:
+            out[first[key]] += f"  [repeated {n}x]"
+    return out
+
+
+def head_tail(text: str, budget: int) -> str:
+    """Head and tail of text within budget tokens, cut at line breaks where one is close."""
+    # the omission marker counts against the budget too; its number is at most the whole text's tokens
+    marker_len = len(f"\n[... ~{estimate_tokens(text)} tokens omitted ...]\n")
+    chars = max(0, int(budget * CHARS_PER_TOKEN) - marker_len)
+    head_n = int(chars * HEAD_SHARE)
+    tail_n = chars - head_n
+    head, tail = text[:head_n], text[len(text) - tail_n :]
+    cut = head.rfind("\n")
+    if cut > head_n * 0.8:
+        head = head[:cut]
+    cut = tail.find("\n")
+    if 0 <= cut < tail_n * 0.2:
+        tail = tail[cut + 1 :]
+    omitted = estimate_tokens(text) - estimate_tokens(head) - estimate_tokens(tail)
+    return f"{head}\n[... ~{omitted} tokens omitted ...]\n{tail}"
+
+
+def trim_text(text: str, budget: int) -> str:
+    """Fits text into budget tokens: collapse stack traces, drop repeated log lines, then keep head and tail."""
+    if estimate_tokens(text) <= budget:
+        return text
+    text = "\n".join(dedupe_lines(collapse_stack_frames(text.splitlines())))
+    if estimate_tokens(text) <= budget:
+        return text
+    return head_tail(text, budget)
+
+
+def budget_incident(
+    row: Dict[str, Any], budgets: Dict[str, int] = FIELD_TOKEN_BUDGETS
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Copy of row with each budgeted field trimmed to its budget, plus the estimated
+    input tokens of those fields before and after ({"original": .., "sent": ..}).
+    """
+    out = dict(row)
+    original = sent = 0
+    for field, budget in budgets.items():
+        text = str(row.get(field, "") or "")
+        trimmed = trim_text(text, budget)
+        original += estimate_tokens(text)
+        sent += estimate_tokens(trimmed)
+        if field in row:
+            out[field] = trimmed
+    return out, {"original": original, "sent": sent}
+
+
+# kind -> (static system prefix, output schema)
+PROMPT_SPECS = {
+    "evaluation": (EVAL_SYSTEM, EVAL_SCHEMA),
+    "critic": (CRITIC_SYSTEM, CRITIC_SCHEMA),
+    "improve": (IMPROVE_SYSTEM, IMPROVE_SCHEMA),
+}
+
+
+def generate_checked(
+    client: OllamaClient,
+    kind: str,
+    prompt: str,
+    on_partial: Optional[PartialCallback] = None,
+) -> Dict[str, Any]:
+    """
+    Schema-constrained generation plus local repair (see validation.py), so a
+    slightly-off answer is fixed here instead of costing another inference.
+    Outcomes are counted in client.output_stats.
+    """
+    system, schema = PROMPT_SPECS[kind]
+    try:
+        raw = client.generate_json(prompt, on_partial=on_partial, schema=schema, system=system, validate=COERCERS[kind])
+        result, repairs = COERCERS[kind](raw)
+    except ValueError:
+        # json.JSONDecodeError is a ValueError as well
+        client.output_stats.record(kind, "failed")
+        raise
+    client.output_stats.record(kind, "repaired" if repairs else "ok")
+    if repairs:
+        result["_repairs"] = repairs
+    return result
+
+
+def evaluate_incident(
+    client: OllamaClient, row: Dict[str, Any], on_partial: Optional[PartialCallback] = None
+) -> Dict[str, Any]:
+    """Scores one incident; the result carries its input token counts as _input_tokens (see budget_incident)."""
+    row, tokens = budget_incident(row)
+    prompt = EVAL_INPUT.format(
         incident_id=row.get("incident_id", ""),
         summary=row.get("summary", ""),
         description=row.get("description", ""),
@@ -43,25 +638,111 @@ def evaluate_incident(client: OllamaClient, row: Dict[str, Any]) -> Dict[str, An
         resolution=row.get("resolution", ""),
         preventive_action=row.get("preventive_action", ""),
     )
-    return client.generate_json(prompt)
+    evaluation = generate_checked(client, "evaluation", prompt, on_partial)
+    evaluation["_input_tokens"] = tokens
+    return evaluation
+
+
+def evaluate_incidents_packed(
+    client: OllamaClient,
+    rows: List[Dict[str, Any]],
+    timeout_s: int = 600,
+    context_tokens: int = PACKED_CONTEXT_TOKENS,
+) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """
+    Scores several incidents in one request, sharing the rubric/schema prefix.
+    Only the leading rows whose prompt and answers fit context_tokens are sent;
+    with fewer than two of them no request is made.
+    Returns ({incident_id: evaluation}, number of incidents sent): evaluations for every
+    entry that came back with a requested ID and passed validation, and 0 when no
+    request was made. IDs not sent, missing from the answer (or an unparseable answer)
+    are left out; callers fall back to evaluate_incident for those.
+    """
+    budgeted = [budget_incident(row) for row in rows]
+    tokens = {str(row.get("incident_id", "")): t for row, t in budgeted}
+    used = estimate_tokens(EVAL_PACKED_SYSTEM) + estimate_tokens(EVAL_PACKED_INPUT)
+    blocks: List[str] = []
+    for row, _ in budgeted:
+        block = PACKED_INCIDENT.format(
+            incident_id=row.get("incident_id", ""),
+            summary=row.get("summary", ""),
+            description=row.get("description", ""),
+            root_cause=row.get("root_cause", ""),
+            resolution=row.get("resolution", ""),
+            preventive_action=row.get("preventive_action", ""),
+        )
+        used += estimate_tokens(block) + PACKED_ANSWER_TOKENS
+        if used > context_tokens:
+            break
+        blocks.append(block)
+    if len(blocks) < 2:
+        return {}, 0
+    rows = [row for row, _ in budgeted[: len(blocks)]]
+    prompt = EVAL_PACKED_INPUT.format(count=len(rows), incidents="\n".join(blocks))
+    wanted = {str(row.get("incident_id", "")) for row in rows}
+
+    def collect(raw: Any) -> Dict[str, Tuple[Dict[str, Any], List[str]]]:
+        entries = raw.get("results", []) if isinstance(raw, dict) else raw
+        found: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            incident_id = str(entry.get("incident_id", "")).strip()
+            if incident_id not in wanted or incident_id in found:
+                continue
+            try:
+                found[incident_id] = coerce_evaluation({k: v for k, v in entry.items() if k != "incident_id"})
+            except ValueError:
+                continue
+        if not found:
+            raise ValueError("packed answer has no valid entry for the requested IDs")
+        return found
+
+    try:
+        found = collect(
+            client.generate_json(
+                prompt, timeout_s=timeout_s, schema=EVAL_PACKED_SCHEMA, system=EVAL_PACKED_SYSTEM, validate=collect
+            )
+        )
+    except ValueError:
+        return {}, len(rows)
+    results: Dict[str, Dict[str, Any]] = {}
+    for incident_id, (evaluation, repairs) in found.items():
+        client.output_stats.record("evaluation", "repaired" if repairs else "ok")
+        if repairs:
+            evaluation["_repairs"] = repairs
+        evaluation["_input_tokens"] = tokens[incident_id]
+        results[incident_id] = evaluation
+    return results, len(rows)
 
 
-def critic_review(client: OllamaClient, row: Dict[str, Any], evaluation: Dict[str, Any]) -> Dict[str, Any]:
-    prompt = CRITIC_PROMPT.format(
+def critic_review(
+    client: OllamaClient,
+    row: Dict[str, Any],
+    evaluation: Dict[str, Any],
+    on_partial: Optional[PartialCallback] = None,
+) -> Dict[str, Any]:
+    row, _ = budget_incident(row)
+    prompt = CRITIC_INPUT.format(
         root_cause=row.get("root_cause", ""),
         resolution=row.get("resolution", ""),
         preventive_action=row.get("preventive_action", ""),
-        evaluation_json=json.dumps(evaluation, ensure_ascii=False),
+        evaluation_json=json.dumps(
+            {k: v for k, v in evaluation.items() if not k.startswith("_")}, ensure_ascii=False
+        ),
     )
-    return client.generate_json(prompt)
+    return generate_checked(client, "critic", prompt, on_partial)
 
 
-def improve_rca(client: OllamaClient, row: Dict[str, Any]) -> Dict[str, Any]:
-    prompt = IMPROVE_PROMPT.format(
+def improve_rca(
+    client: OllamaClient, row: Dict[str, Any], on_partial: Optional[PartialCallback] = None
+) -> Dict[str, Any]:
+    row, _ = budget_incident(row)
+    prompt = IMPROVE_INPUT.format(
         incident_id=row.get("incident_id", ""),
         summary=row.get("summary", ""),
         root_cause=row.get("root_cause", ""),
         resolution=row.get("resolution", ""),
         preventive_action=row.get("preventive_action", ""),
     )
-    return client.generate_json(prompt)
+    return generate_checked(client, "improve", prompt, on_partial)
@@ -0,0 +1,202 @@
+import json
+import math
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+# A metrics hook is any callable taking one call record (a flat dict, see call_record)
+MetricsHook = Callable[[Dict[str, Any]], None]
+
+# load_duration above this counts as a model (re)load rather than a warm call
+MODEL_LOAD_THRESHOLD_MS = 500.0
+
+
+def ns_to_ms(value: Any) -> Optional[float]:
+    return round(value / 1e6, 3) if isinstance(value, (int, float)) else None
+
+
+class JsonlSink:
+    """Appends one JSON line per LLM call."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._f = self.path.open("a", encoding="utf-8")
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._f.write(line + "\n")
+            self._f.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._f.close()
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+class MetricsCollector:
+    """In-memory aggregation of call records for reports and Prometheus export."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records: List[Dict[str, Any]] = []
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            records = list(self.records)
+        ok = [r for r in records if r.get("status") == "ok"]
+        wall = sorted(r["wall_ms"] for r in ok)
+        eval_tokens = sum(r.get("eval_count") or 0 for r in ok)
+        eval_ms = sum(r.get("eval_ms") or 0 for r in ok)
+        prompt_tokens = sum(r.get("prompt_eval_count") or 0 for r in ok)
+        prompt_ms = sum(r.get("prompt_eval_ms") or 0 for r in ok)
+        load_ms = [r.get("load_ms") or 0 for r in ok]
+        server_ms = sum(r.get("total_ms") or 0 for r in ok)
+        return {
+            "calls": len(records),
+            "errors": len(records) - len(ok),
+            "retries": sum(r.get("retries", 0) for r in records),
+            "latency_p50_ms": _percentile(wall, 0.50),
+            "latency_p95_ms": _percentile(wall, 0.95),
+            "latency_p99_ms": _percentile(wall, 0.99),
+            "latency_max_ms": wall[-1] if wall else 0.0,
+            "prompt_tokens": prompt_tokens,
+            "eval_tokens": eval_tokens,
+            "prompt_tokens_per_s": prompt_tokens / (prompt_ms / 1000) if prompt_ms else 0.0,
+            "eval_tokens_per_s": eval_tokens / (eval_ms / 1000) if eval_ms else 0.0,
+            "prompt_eval_ms": prompt_ms,
+            "eval_ms": eval_ms,
+            "load_ms": sum(load_ms),
+            "server_ms": server_ms,
+            "model_loads": sum(1 for ms in load_ms if ms >= MODEL_LOAD_THRESHOLD_MS),
+            "hosts": self._per_host(records),
+        }
+
+    @staticmethod
+    def _per_host(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        by_host: Dict[str, List[Dict[str, Any]]] = {}
+        for r in records:
+            by_host.setdefault(r.get("host") or "", []).append(r)
+        out = {}
+        for host, rs in sorted(by_host.items()):
+            wall = sorted(r["wall_ms"] for r in rs if r.get("status") == "ok")
+            out[host] = {
+                "calls": len(rs),
+                "errors": len(rs) - len(wall),
+                "latency_p50_ms": _percentile(wall, 0.50),
+                "eval_tokens": sum(r.get("eval_count") or 0 for r in rs),
+                # adaptive concurrency limit at the host's latest call (None when fixed)
+                "limit": rs[-1].get("limit"),
+                "limit_max": max((r.get("limit") or 0 for r in rs), default=0) or None,
+            }
+        return out
+
+    def prometheus_text(self, prefix: str = "rca_llm") -> str:
+        """Prometheus text exposition format (for a textfile collector or scraping)."""
+        s = self.summary()
+        with self._lock:
+            wall = [r["wall_ms"] / 1000 for r in self.records if r.get("status") == "ok"]
+        buckets = [0.5, 1, 2, 5, 10, 20, 30, 60, 120, 180, float("inf")]
+        lines = [
+            f"# HELP {prefix}_calls_total LLM calls by outcome.",
+            f"# TYPE {prefix}_calls_total counter",
+            f'{prefix}_calls_total{{status="ok"}} {s["calls"] - s["errors"]}',
+            f'{prefix}_calls_total{{status="error"}} {s["errors"]}',
+            f"# HELP {prefix}_retries_total Retried HTTP attempts.",
+            f"# TYPE {prefix}_retries_total counter",
+            f"{prefix}_retries_total {s['retries']}",
+            f"# HELP {prefix}_tokens_total Tokens processed by Ollama.",
+            f"# TYPE {prefix}_tokens_total counter",
+            f'{prefix}_tokens_total{{phase="prompt"}} {s["prompt_tokens"]}',
+            f'{prefix}_tokens_total{{phase="eval"}} {s["eval_tokens"]}',
+            f"# HELP {prefix}_phase_seconds_total Server-side time per phase.",
+            f"# TYPE {prefix}_phase_seconds_total counter",
+            f'{prefix}_phase_seconds_total{{phase="load"}} {s["load_ms"] / 1000:.3f}',
+            f'{prefix}_phase_seconds_total{{phase="prompt"}} {s["prompt_eval_ms"] / 1000:.3f}',
+            f'{prefix}_phase_seconds_total{{phase="eval"}} {s["eval_ms"] / 1000:.3f}',
+            f"# HELP {prefix}_model_loads_total Calls that had to load the model.",
+            f"# TYPE {prefix}_model_loads_total counter",
+            f"{prefix}_model_loads_total {s['model_loads']}",
+            f"# HELP {prefix}_host_calls_total LLM calls per Ollama host and outcome.",
+            f"# TYPE {prefix}_host_calls_total counter",
+        ]
+        for host, h in s["hosts"].items():
+            lines.append(f'{prefix}_host_calls_total{{host="{host}",status="ok"}} {h["calls"] - h["errors"]}')
+            lines.append(f'{prefix}_host_calls_total{{host="{host}",status="error"}} {h["errors"]}')
+        limits = {host: h["limit"] for host, h in s["hosts"].items() if h["limit"] is not None}
+        if limits:
+            lines += [
+                f"# HELP {prefix}_concurrency_limit Adaptive in-flight limit per Ollama host.",
+                f"# TYPE {prefix}_concurrency_limit gauge",
+            ]
+            lines += [f'{prefix}_concurrency_limit{{host="{host}"}} {v}' for host, v in limits.items()]
+        lines += [
+            f"# HELP {prefix}_request_seconds Client-side wall time per successful call.",
+            f"# TYPE {prefix}_request_seconds histogram",
+        ]
+        for b in buckets:
+            le = "+Inf" if math.isinf(b) else f"{b:g}"
+            lines.append(f'{prefix}_request_seconds_bucket{{le="{le}"}} {sum(1 for w in wall if w <= b)}')
+        lines.append(f"{prefix}_request_seconds_sum {sum(wall):.3f}")
+        lines.append(f"{prefix}_request_seconds_count {len(wall)}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        # write-then-rename so a textfile collector never reads a half-written file
+        tmp = Path(f"{path}.tmp")
+        tmp.write_text(self.prometheus_text(), encoding="utf-8")
+        tmp.replace(path)
+
+
+def call_record(
+    model: str,
+    endpoint: str,
+    started: float,
+    wall_ms: float,
+    retries: int,
+    status: str,
+    data: Optional[Dict[str, Any]] = None,
+    error: str = "",
+    host: str = "",
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Flat record of one LLM call: client wall time plus Ollama's server-side timings."""
+    data = data or {}
+    record = {
+        "ts": round(started, 3),
+        "model": model,
+        "endpoint": endpoint,
+        "host": host,
+        "limit": limit,
+        "status": status,
+        "wall_ms": round(wall_ms, 3),
+        "retries": retries,
+        "total_ms": ns_to_ms(data.get("total_duration")),
+        "load_ms": ns_to_ms(data.get("load_duration")),
+        "prompt_eval_count": data.get("prompt_eval_count"),
+        "prompt_eval_ms": ns_to_ms(data.get("prompt_eval_duration")),
+        "eval_count": data.get("eval_count"),
+        "eval_ms": ns_to_ms(data.get("eval_duration")),
+    }
+    if error:
+        record["error"] = error
+    return record
+
+
+def hooks_from_env() -> List[MetricsHook]:
+    """RCA_METRICS_JSONL=<path> appends per-call records there (UI / MCP server)."""
+    path = os.getenv("RCA_METRICS_JSONL", "").strip()
+    return [JsonlSink(path)] if path else []
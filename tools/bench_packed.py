@@ -0,0 +1,124 @@
+"""
+Compares packed (K incidents per request) against unpacked evaluation on a sample:
+wall time, tokens/sec as reported by Ollama and agreement of the scores.
+
+    python tools/bench_packed.py --csv data/example_incidents.csv --sample 20 --pack 5
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from incident_io import iter_csv_chunks, records  # noqa: E402
+from rca_scoring import OllamaClient, evaluate_incident, evaluate_incidents_packed  # noqa: E402
+
+DIMENSIONS = ["clarity", "depth", "evidence", "corrective", "preventive"]
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Benchmark packed vs. unpacked RCA evaluation")
+    p.add_argument("--csv", required=True)
+    p.add_argument("--model", default=os.getenv("OLLAMA_MODEL", "llama3.1:8b"))
+    p.add_argument("--host", default=os.getenv("OLLAMA_HOST", "http://localhost:11434"))
+    p.add_argument("--sample", type=int, default=20, help="Incidents to score in each mode")
+    p.add_argument("--pack", type=int, default=5, help="Incidents per packed request")
+    p.add_argument("--col-id", default="issue_key")
+    p.add_argument("--col-summary", default="summary")
+    p.add_argument("--col-description", default="description")
+    p.add_argument("--col-root-cause", default="root_cause")
+    p.add_argument("--col-resolution", default="resolution")
+    p.add_argument("--col-preventive", default="preventive_action")
+    p.add_argument("--out", default="", help="Optional path for the JSON result")
+    return p.parse_args()
+
+
+def run_mode(client: OllamaClient, incidents: List[Dict[str, Any]], pack: int) -> Dict[str, Any]:
+    evaluations: Dict[str, Dict[str, Any]] = {}
+    fallback = 0
+    t0 = time.perf_counter()
+    if pack <= 1:
+        for inc in incidents:
+            evaluations[inc["incident_id"]] = evaluate_incident(client, inc)
+    else:
+        for i in range(0, len(incidents), pack):
+            group = incidents[i : i + pack]
+            got, _ = evaluate_incidents_packed(client, group)
+            for inc in group:
+                if inc["incident_id"] not in got:
+                    fallback += 1
+                    got[inc["incident_id"]] = evaluate_incident(client, inc)
+            evaluations.update(got)
+    wall = time.perf_counter() - t0
+    usage = dict(client.usage)
+    return {
+        "pack": pack,
+        "incidents": len(incidents),
+        "requests": usage["calls"],
+        "fallback": fallback,
+        "wall_s": round(wall, 3),
+        "incidents_per_s": round(len(incidents) / wall, 3) if wall else None,
+        "prompt_tokens_per_incident": round(usage["prompt_tokens"] / len(incidents), 1) if incidents else None,
+        "completion_tokens_per_incident": round(usage["completion_tokens"] / len(incidents), 1) if incidents else None,
+        "tokens_per_s": round((usage["prompt_tokens"] + usage["completion_tokens"]) / wall, 1) if wall else None,
+        "evaluations": evaluations,
+    }
+
+
+def agreement(a: Dict[str, Dict[str, Any]], b: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    ids = [i for i in a if i in b]
+    if not ids:
+        return {"compared": 0}
+    diffs = [abs(a[i]["total"] - b[i]["total"]) for i in ids]
+    per_dim = {
+        d: round(sum(abs(a[i]["scores"][d] - b[i]["scores"][d]) for i in ids) / len(ids), 2) for d in DIMENSIONS
+    }
+    return {
+        "compared": len(ids),
+        "total_mae": round(sum(diffs) / len(ids), 2),
+        "total_within_5": round(sum(1 for d in diffs if d <= 5) / len(ids), 3),
+        "dimension_mae": per_dim,
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    colmap = {
+        "incident_id": args.col_id,
+        "summary": args.col_summary,
+        "description": args.col_description,
+        "root_cause": args.col_root_cause,
+        "resolution": args.col_resolution,
+        "preventive_action": args.col_preventive,
+    }
+    chunks = iter_csv_chunks(args.csv, list(colmap.values()), limit=args.sample)
+    incidents = [{k: str(r[c]) for k, c in colmap.items()} for r in records(chunks)]
+
+    # separate clients so token counters don't mix; no response cache on purpose
+    unpacked = run_mode(OllamaClient(model=args.model, host=args.host), incidents, 1)
+    packed = run_mode(OllamaClient(model=args.model, host=args.host), incidents, args.pack)
+
+    result = {
+        "model": args.model,
+        "host": args.host,
+        "csv": args.csv,
+        "unpacked": {k: v for k, v in unpacked.items() if k != "evaluations"},
+        "packed": {k: v for k, v in packed.items() if k != "evaluations"},
+        "agreement": agreement(unpacked["evaluations"], packed["evaluations"]),
+    }
+    if unpacked["wall_s"] and packed["wall_s"]:
+        result["speedup"] = round(unpacked["wall_s"] / packed["wall_s"], 2)
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
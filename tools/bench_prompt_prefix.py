@@ -0,0 +1,87 @@
+"""
+Measures how much of each evaluation prompt the server actually re-processes,
+using the prompt_eval_count / prompt_eval_duration fields Ollama returns.
+With the static prefix reused from the KV cache, calls after the first one
+should only pay for the incident data.
+
+    python tools/bench_prompt_prefix.py --csv data/example_incidents.csv --sample 10
+"""
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from incident_io import iter_csv_chunks, records  # noqa: E402
+from rca_scoring import OllamaClient, evaluate_incident  # noqa: E402
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Prompt-prefix reuse benchmark (/api/generate vs /api/chat)")
+    p.add_argument("--csv", required=True)
+    p.add_argument("--model", default=os.getenv("OLLAMA_MODEL", "llama3.1:8b"))
+    p.add_argument("--host", default=os.getenv("OLLAMA_HOST", "http://localhost:11434"))
+    p.add_argument("--sample", type=int, default=10)
+    p.add_argument("--col-id", default="issue_key")
+    p.add_argument("--col-summary", default="summary")
+    p.add_argument("--col-description", default="description")
+    p.add_argument("--col-root-cause", default="root_cause")
+    p.add_argument("--col-resolution", default="resolution")
+    p.add_argument("--col-preventive", default="preventive_action")
+    p.add_argument("--out", default="", help="Optional path for the JSON result")
+    return p.parse_args()
+
+
+def run_mode(args: argparse.Namespace, incidents: List[Dict[str, Any]], use_chat: bool) -> Dict[str, Any]:
+    per_call = []
+    client = OllamaClient(model=args.model, host=args.host, use_chat=use_chat)
+    for inc in incidents:
+        before = dict(client.usage)
+        evaluate_incident(client, inc)
+        per_call.append(
+            {
+                "prompt_tokens": client.usage["prompt_tokens"] - before["prompt_tokens"],
+                "prompt_eval_ms": round(client.usage["prompt_eval_ms"] - before["prompt_eval_ms"], 1),
+            }
+        )
+    warm = per_call[1:] or per_call
+    return {
+        "endpoint": "/api/chat" if use_chat else "/api/generate",
+        "calls": len(per_call),
+        "first_call": per_call[0] if per_call else None,
+        "warm_mean_prompt_tokens": round(sum(c["prompt_tokens"] for c in warm) / len(warm), 1) if warm else None,
+        "warm_mean_prompt_eval_ms": round(sum(c["prompt_eval_ms"] for c in warm) / len(warm), 1) if warm else None,
+        "total_prompt_eval_ms": round(sum(c["prompt_eval_ms"] for c in per_call), 1),
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    colmap = {
+        "incident_id": args.col_id,
+        "summary": args.col_summary,
+        "description": args.col_description,
+        "root_cause": args.col_root_cause,
+        "resolution": args.col_resolution,
+        "preventive_action": args.col_preventive,
+    }
+    chunks = iter_csv_chunks(args.csv, list(colmap.values()), limit=args.sample)
+    incidents = [{k: str(r[c]) for k, c in colmap.items()} for r in records(chunks)]
+
+    result = {
+        "model": args.model,
+        "generate": run_mode(args, incidents, use_chat=False),
+        "chat": run_mode(args, incidents, use_chat=True),
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,147 @@
+import re
+import threading
+from typing import Any, Dict, List, Tuple
+
+SCORE_KEYS = ["clarity", "depth", "evidence", "corrective", "preventive"]
+CONFIDENCE_LEVELS = ["low", "medium", "high"]
+MAX_SUMMARY_WORDS = 60
+
+
+class OutputStats:
+    """Thread-safe counters of how often model output was clean, repaired or unusable."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, kind: str, outcome: str) -> None:
+        with self._lock:
+            per_kind = self.counts.setdefault(kind, {"ok": 0, "repaired": 0, "failed": 0})
+            per_kind[outcome] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            ok = sum(c["ok"] for c in self.counts.values())
+            repaired = sum(c["repaired"] for c in self.counts.values())
+            failed = sum(c["failed"] for c in self.counts.values())
+            by_kind = {k: dict(v) for k, v in self.counts.items()}
+        total = ok + repaired + failed
+        return {
+            "calls": total,
+            "ok": ok,
+            "repaired": repaired,
+            "failed": failed,
+            "repair_rate": repaired / total if total else 0.0,
+            "failure_rate": failed / total if total else 0.0,
+            "by_kind": by_kind,
+        }
+
+
+def _to_int(value: Any) -> Any:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(round(value))
+    if isinstance(value, str):
+        # "15", "15/20", "15 points"
+        m = re.search(r"-?\d+(\.\d+)?", value)
+        if m:
+            return int(round(float(m.group(0))))
+    return None
+
+
+def _to_str_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(v) for v in value if v is not None and str(v).strip()]
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    return [str(value)]
+
+
+def _ensure_dict(obj: Any, kind: str) -> Dict[str, Any]:
+    if not isinstance(obj, dict):
+        raise ValueError(f"{kind}: expected a JSON object, got {type(obj).__name__}")
+    return dict(obj)
+
+
+def _coerce_list_fields(out: Dict[str, Any], keys: List[str], repairs: List[str]) -> None:
+    for key in keys:
+        value = out.get(key)
+        if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+            repairs.append(f"{key}: coerced to list of strings")
+        out[key] = _to_str_list(value)
+
+
+def _coerce_str_fields(out: Dict[str, Any], keys: List[str], repairs: List[str]) -> None:
+    for key in keys:
+        value = out.get(key)
+        if not isinstance(value, str):
+            repairs.append(f"{key}: coerced to string")
+            out[key] = "" if value is None else str(value)
+
+
+def coerce_evaluation(obj: Any) -> Tuple[Dict[str, Any], List[str]]:
+    """Clamps each score to 0..20, recomputes total and normalizes the list/text fields."""
+    out = _ensure_dict(obj, "evaluation")
+    repairs: List[str] = []
+
+    raw_scores = out.get("scores")
+    if not isinstance(raw_scores, dict):
+        raise ValueError("evaluation: 'scores' object missing")
+    scores: Dict[str, int] = {}
+    for key in SCORE_KEYS:
+        value = _to_int(raw_scores.get(key))
+        if value is None:
+            raise ValueError(f"evaluation: score '{key}' missing or not a number")
+        clamped = min(max(value, 0), 20)
+        if clamped != raw_scores.get(key):
+            repairs.append(f"scores.{key}: {raw_scores.get(key)!r} -> {clamped}")
+        scores[key] = clamped
+    out["scores"] = scores
+
+    total = sum(scores.values())
+    if out.get("total") != total:
+        repairs.append(f"total: {out.get('total')!r} -> {total}")
+    out["total"] = total
+
+    _coerce_list_fields(out, ["strengths", "gaps", "improvements"], repairs)
+    _coerce_str_fields(out, ["executive_summary"], repairs)
+    words = out["executive_summary"].split()
+    if len(words) > MAX_SUMMARY_WORDS:
+        repairs.append("executive_summary: trimmed to 60 words")
+        out["executive_summary"] = " ".join(words[:MAX_SUMMARY_WORDS])
+    return out, repairs
+
+
+def coerce_critic(obj: Any) -> Tuple[Dict[str, Any], List[str]]:
+    out = _ensure_dict(obj, "critic")
+    repairs: List[str] = []
+    _coerce_list_fields(out, ["top_risks", "missing_evidence_requests"], repairs)
+    confidence = str(out.get("confidence", "")).strip().lower()
+    if confidence not in CONFIDENCE_LEVELS:
+        # be conservative about unreadable confidence values
+        repairs.append(f"confidence: {out.get('confidence')!r} -> 'low'")
+        confidence = "low"
+    elif confidence != out.get("confidence"):
+        repairs.append(f"confidence: normalized to {confidence!r}")
+    out["confidence"] = confidence
+    return out, repairs
+
+
+def coerce_improve(obj: Any) -> Tuple[Dict[str, Any], List[str]]:
+    out = _ensure_dict(obj, "improve")
+    repairs: List[str] = []
+    _coerce_str_fields(out, ["improved_root_cause", "improved_resolution", "improved_preventive_action"], repairs)
+    _coerce_list_fields(out, ["notes"], repairs)
+    return out, repairs
+
+
+COERCERS = {
+    "evaluation": coerce_evaluation,
+    "critic": coerce_critic,
+    "improve": coerce_improve,
+}